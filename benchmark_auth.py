@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai: inscription et connexion synchrones (DRF) contre les variantes asynchrones
+
+Les requêtes sont envoyées en parallèle directement à l'application ASGI
+(celle que sert Daphne), sans réseau: on mesure le débit et la latence des
+vues sous N clients simultanés.
+Usage: python benchmark_auth.py [--clients 50 200 1000] [--iterations N]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+import django
+
+# Configuration Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'elite_backend.settings')
+django.setup()
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from core.models import User
+
+ENDPOINTS = {
+    'sync': ('/api/auth/register/', '/api/auth/login/'),
+    'async': ('/api/auth/async/register/', '/api/auth/async/login/'),
+}
+
+
+async def post(app, path, payload):
+    """Une requête POST JSON envoyée à l'application ASGI; retourne (status, durée)"""
+    body = json.dumps(payload).encode()
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'POST', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': b'', 'root_path': '',
+        'headers': [
+            (b'host', b'testserver'), (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ],
+        'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+    }
+    done = asyncio.Event()
+    received = False
+    response = {}
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        # Le client reste connecté jusqu'à la fin de la réponse
+        await done.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        elif message['type'] == 'http.response.body' and not message.get('more_body'):
+            done.set()
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    return response.get('status'), time.perf_counter() - start
+
+
+async def run_round(app, path, payloads):
+    start = time.perf_counter()
+    results = await asyncio.gather(*(post(app, path, payload) for payload in payloads))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(duration for status, duration in results)
+    errors = sum(1 for status, duration in results if status not in (200, 201))
+    return {
+        'rps': len(payloads) / elapsed,
+        'p50': statistics.median(latencies),
+        'p95': latencies[int(len(latencies) * 0.95) - 1],
+        'errors': errors,
+    }
+
+
+async def benchmark(clients_counts):
+    app = get_asgi_application()
+    prefix = f'bench{uuid.uuid4().hex[:6]}'
+    print(f"PBKDF2: {settings.PASSWORD_HASH_ITERATIONS} itérations, {settings.AUTH_HASH_WORKERS} threads de hachage")
+    print(f"{'clients':>8} {'variante':>8} {'opération':>10} {'req/s':>8} {'p50 (s)':>8} {'p95 (s)':>8} {'erreurs':>8}")
+
+    try:
+        for clients in clients_counts:
+            for variant, (register_path, login_path) in ENDPOINTS.items():
+                users = [
+                    {'username': f'{prefix}{variant}{clients}x{i}', 'email': f'{prefix}{variant}{clients}x{i}@bench.ci',
+                     'password': 'Bench-Passw0rd'}
+                    for i in range(clients)
+                ]
+                for operation, path, payloads in (
+                    ('register', register_path, users),
+                    ('login', login_path, [{'username': u['username'], 'password': u['password']} for u in users]),
+                ):
+                    result = await run_round(app, path, payloads)
+                    print(f"{clients:>8} {variant:>8} {operation:>10} {result['rps']:>8.1f} "
+                          f"{result['p50']:>8.3f} {result['p95']:>8.3f} {result['errors']:>8}")
+    finally:
+        await sync_to_async(lambda: User.objects.filter(username__startswith=prefix).delete())()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, nargs='+', default=[50, 200, 1000],
+                        help="Nombres de clients simultanés à tester")
+    parser.add_argument('--iterations', type=int, default=None,
+                        help="Surcharger PASSWORD_HASH_ITERATIONS pour ce banc d'essai")
+    args = parser.parse_args()
+
+    settings.ALLOWED_HOSTS = ['*']
+    if args.iterations:
+        settings.PASSWORD_HASH_ITERATIONS = args.iterations
+    asyncio.run(benchmark(args.clients))
+    sys.exit(0)
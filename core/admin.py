@@ -1,17 +1,26 @@
-from django.contrib import admin
+import math
+
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseRedirect
+from django.urls import path, reverse
+from django.views.decorators.http import require_POST
 from .models import *
+from .jobs import job_log_path, start_command
+from .quizzes import item_indices
 
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
-    list_display = ['username', 'email', 'academic_level', 'has_completed_matching', 'referral_points', 'referred_by']
+    list_display = ['username', 'email', 'academic_level', 'has_completed_matching', 'referral_points', 'referral_count', 'referred_by']
     list_filter = ['academic_level', 'has_completed_matching', 'is_staff']
     search_fields = ['username', 'email', 'referral_code']
+    readonly_fields = ['referral_count']
     
     fieldsets = BaseUserAdmin.fieldsets + (
         ('Informations Elite', {
             'fields': ('phone', 'city', 'academic_level', 'referral_code', 'referred_by', 
-                      'referral_points', 'has_completed_matching', 'selected_profile')
+                      'referral_points', 'referral_count', 'has_completed_matching', 'selected_profile')
         }),
     )
 
@@ -19,6 +28,21 @@ class UserAdmin(BaseUserAdmin):
 class MatchingAnswerInline(admin.TabularInline):
     model = MatchingAnswer
     extra = 4
+    readonly_fields = ['profile_weights']
+    show_change_link = True
+
+
+class MatchingAnswerWeightInline(admin.TabularInline):
+    model = MatchingAnswerWeight
+    extra = 3
+
+
+@admin.register(MatchingAnswer)
+class MatchingAnswerAdmin(admin.ModelAdmin):
+    list_display = ['text', 'question']
+    list_filter = ['question']
+    readonly_fields = ['profile_weights']
+    inlines = [MatchingAnswerWeightInline]
 
 
 @admin.register(MatchingQuestion)
@@ -26,6 +50,34 @@ class MatchingQuestionAdmin(admin.ModelAdmin):
     list_display = ['text', 'order', 'is_active']
     list_filter = ['is_active']
     inlines = [MatchingAnswerInline]
+    # Bouton « Recalculer les recommandations » au-dessus de la liste
+    change_list_template = 'admin/core/matchingquestion/change_list.html'
+    
+    def get_urls(self):
+        return [
+            path(
+                'recompute-recommendations/',
+                self.admin_site.admin_view(require_POST(self.recompute_recommendations_view)),
+                name='core_matchingquestion_recompute',
+            ),
+        ] + super().get_urls()
+    
+    def recompute_recommendations_view(self, request):
+        """Recalcul de tous les utilisateurs, indépendant de la sélection
+
+        Plusieurs minutes et un pool de processus: lancé hors du worker ASGI,
+        une seule exécution à la fois.
+        """
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        if start_command('recompute_recommendations'):
+            self.message_user(
+                request,
+                f"Recalcul des recommandations lancé en arrière-plan (journal: {job_log_path('recompute_recommendations')})"
+            )
+        else:
+            self.message_user(request, "Un recalcul des recommandations est déjà en cours", level=messages.WARNING)
+        return HttpResponseRedirect(reverse('admin:core_matchingquestion_changelist'))
 
 
 @admin.register(Profile)
@@ -35,6 +87,13 @@ class ProfileAdmin(admin.ModelAdmin):
     search_fields = ['name']
 
 
+@admin.register(UserProfileRecommendation)
+class UserProfileRecommendationAdmin(admin.ModelAdmin):
+    list_display = ['user', 'profile', 'rank', 'score', 'computed_at']
+    search_fields = ['user__username']
+    raw_id_fields = ['user']
+
+
 @admin.register(AdaptivePath)
 class AdaptivePathAdmin(admin.ModelAdmin):
     list_display = ['profile', 'academic_level', 'duration_months']
@@ -86,6 +145,27 @@ class QuizAdmin(admin.ModelAdmin):
     inlines = [QuizQuestionInline]
 
 
+@admin.register(QuizQuestionStats)
+class QuizQuestionStatsAdmin(admin.ModelAdmin):
+    list_display = ['question', 'attempts', 'correct', 'difficulty', 'discrimination']
+    list_filter = ['question__quiz']
+    list_select_related = ['question__quiz__chapter']
+    readonly_fields = ['question', 'attempts', 'correct', 'score_sum', 'score_sq_sum', 'correct_score_sum']
+    
+    def indices(self, obj):
+        return item_indices(obj.attempts, obj.correct, obj.score_sum, obj.score_sq_sum, obj.correct_score_sum)
+    
+    @admin.display(description="Difficulté")
+    def difficulty(self, obj):
+        value = self.indices(obj)[0]
+        return f"{value:.2f}" if math.isfinite(value) else '-'
+    
+    @admin.display(description="Discrimination")
+    def discrimination(self, obj):
+        value = self.indices(obj)[1]
+        return f"{value:.2f}" if math.isfinite(value) else '-'
+
+
 @admin.register(UserCoursePurchase)
 class UserCoursePurchaseAdmin(admin.ModelAdmin):
     list_display = ['user', 'course_pack', 'amount_paid', 'purchased_at']
@@ -100,11 +180,25 @@ class QuizAttemptAdmin(admin.ModelAdmin):
     search_fields = ['user__username']
 
 
+@admin.register(CourseProgress)
+class CourseProgressAdmin(admin.ModelAdmin):
+    list_display = ['user', 'course_pack', 'current_chapter_order', 'updated_at']
+    search_fields = ['user__username', 'course_pack__title']
+    raw_id_fields = ['user']
+
+
 @admin.register(ChapterProgress)
 class ChapterProgressAdmin(admin.ModelAdmin):
+    """Ancienne table, lue par personne: consultation seule avant suppression (voir CourseProgress)"""
     list_display = ['user', 'chapter', 'status', 'last_accessed']
     list_filter = ['status']
     search_fields = ['user__username', 'chapter__title']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(PhysicalCenter)
@@ -158,3 +252,10 @@ class ChatMessageAdmin(admin.ModelAdmin):
     list_display = ['sender', 'recipient', 'message', 'is_read', 'created_at']
     list_filter = ['is_read', 'created_at']
     search_fields = ['sender__username', 'recipient__username']
+
+
+@admin.register(Conversation)
+class ConversationAdmin(admin.ModelAdmin):
+    list_display = ['user_low', 'user_high', 'last_message_preview', 'last_message_at', 'unread_low', 'unread_high']
+    search_fields = ['user_low__username', 'user_high__username']
+    readonly_fields = ['user_low', 'user_high', 'last_sender']
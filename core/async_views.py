@@ -0,0 +1,107 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import authenticate, user_login_failed
+from django.contrib.auth.hashers import check_password, make_password
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from .authentication import invalidate_user
+from .models import User
+from .serializers import EliteTokenObtainPairSerializer, UserRegistrationSerializer
+
+
+# PBKDF2 (hashlib) libère le GIL: un pool de threads borné suffit à hacher en
+# parallèle sans bloquer la boucle d'événements ni le thread ORM
+_hash_executor = ThreadPoolExecutor(max_workers=settings.AUTH_HASH_WORKERS, thread_name_prefix='password-hash')
+
+MODEL_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+
+
+async def run_hasher(function, *args):
+    """Exécuter un hachage ou une vérification de mot de passe hors de la boucle"""
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, function, *args)
+
+
+def parse_json(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+@csrf_exempt
+@require_POST
+async def register(request):
+    """Inscription (variante asynchrone de UserRegistrationView)
+
+    Mêmes validations et même réponse; le hachage du mot de passe passe par
+    le pool borné et seules les requêtes ORM occupent le thread de Django.
+    """
+    data = parse_json(request)
+    if data is None:
+        return JsonResponse({'error': 'Corps JSON invalide'}, status=400)
+
+    serializer = UserRegistrationSerializer(data=data)
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=400)
+
+    password_hash = await run_hasher(make_password, serializer.validated_data['password'])
+    await sync_to_async(serializer.save)(password_hash=password_hash)
+    return JsonResponse(serializer.data, status=201)
+
+
+async def check_credentials(request, username, password):
+    """Équivalent de ModelBackend.authenticate, hachage dans le pool borné
+
+    Retourne l'utilisateur ou None; un échec émet user_login_failed comme
+    authenticate(). Un hachage périmé (coût modifié) est recalculé puis
+    enregistré.
+    """
+    user = await User.objects.filter(username=username).afirst()
+    if user is None:
+        # Même durée qu'un mot de passe faux, comme ModelBackend
+        await run_hasher(make_password, password)
+    else:
+        rehash = []
+        if await run_hasher(check_password, password, user.password, rehash.append) and user.is_active:
+            if rehash:
+                user.password = await run_hasher(make_password, password)
+                await User.objects.filter(pk=user.pk).aupdate(password=user.password)
+                invalidate_user(user.pk)
+            return user
+
+    await sync_to_async(user_login_failed.send)(
+        sender=__name__, credentials={'username': username, 'password': '*' * 20}, request=request
+    )
+    return None
+
+
+@csrf_exempt
+@require_POST
+async def login(request):
+    """Connexion par nom d'utilisateur et mot de passe (variante asynchrone de auth/login/)
+
+    Retourne les mêmes jetons que EliteTokenObtainPairSerializer. Avec le seul
+    ModelBackend, le mot de passe est vérifié dans le pool de hachage; si
+    d'autres AUTHENTICATION_BACKENDS sont configurés, authenticate() est
+    appelé tel quel (hachage sur le thread ORM).
+    """
+    data = parse_json(request)
+    if data is None or not data.get('username') or not data.get('password'):
+        return JsonResponse({'error': "Nom d'utilisateur et mot de passe requis"}, status=400)
+
+    if list(settings.AUTHENTICATION_BACKENDS) == [MODEL_BACKEND]:
+        user = await check_credentials(request, data['username'], data['password'])
+    else:
+        user = await sync_to_async(authenticate)(request, username=data['username'], password=data['password'])
+
+    if user is None:
+        return JsonResponse({'detail': 'No active account found with the given credentials'}, status=401)
+
+    return JsonResponse(EliteTokenObtainPairSerializer.tokens_for(user))
@@ -0,0 +1,94 @@
+import copy
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache import TTLCache, bump_version, get_version
+
+
+USER_CACHE_PREFIX = 'elite:auth:user:v2:'
+
+
+_tokens = TTLCache(settings.AUTH_CACHE_MAX_ENTRIES, settings.AUTH_CACHE_TTL)
+_users = TTLCache(settings.AUTH_CACHE_MAX_ENTRIES, settings.AUTH_CACHE_TTL)
+
+
+def user_version(user_id):
+    return get_version(f'auth-user:{user_id}')
+
+
+def invalidate_user(user_id):
+    """Oublier l'utilisateur en cache après une modification de son profil
+
+    Le jeton de version de l'utilisateur change: les copies gardées par les
+    autres workers ne correspondent plus et sont relues à leur prochain accès.
+    """
+    bump_version(f'auth-user:{user_id}')
+    _users.pop(user_id)
+    if settings.AUTH_CACHE_SHARED:
+        cache.delete(f'{USER_CACHE_PREFIX}{user_id}')
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication avec cache des jetons vérifiés et des utilisateurs
+
+    La signature d'un jeton n'est vérifiée qu'une fois par TTL et la ligne
+    User n'est relue qu'après expiration ou invalidation (post_save sur User).
+    Chaque copie est étiquetée avec le jeton de version de l'utilisateur
+    (core.cache), vérifié à chaque accès: une invalidation dans un worker
+    s'applique à tous. Avec AUTH_CACHE_SHARED, les utilisateurs sont aussi
+    partagés entre workers via le cache Django.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = _tokens.get(raw_token)
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            # Ne jamais garder un jeton au-delà de son expiration
+            _tokens.set(raw_token, token, ttl=token['exp'] - time.time())
+        return token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        # Version lue avant la ligne: une invalidation concurrente la rend périmée
+        version = user_version(user_id)
+        user = None
+        entry = _users.get(user_id)
+        if entry is None and settings.AUTH_CACHE_SHARED:
+            entry = cache.get(f'{USER_CACHE_PREFIX}{user_id}')
+            if entry is not None and entry[0] == version:
+                _users.set(user_id, entry)
+        if entry is not None and entry[0] == version:
+            user = entry[1]
+        if user is None:
+            try:
+                user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            _users.set(user_id, (version, user))
+            if settings.AUTH_CACHE_SHARED:
+                cache.set(f'{USER_CACHE_PREFIX}{user_id}', (version, user), settings.AUTH_CACHE_TTL)
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        # Chaque requête reçoit sa propre copie: les vues modifient request.user
+        return copy.copy(user)
@@ -0,0 +1,85 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+
+
+VERSION_KEY_PREFIX = 'elite:version:'
+
+
+def get_version(name):
+    """Jeton de version partagé entre les workers via le cache Django"""
+    key = VERSION_KEY_PREFIX + name
+    version = cache.get(key)
+    if version is None:
+        # Cache vidé ou premier accès: un nouveau jeton force la reconstruction
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(name):
+    """Invalider toutes les copies dérivées d'une ressource"""
+    version = uuid.uuid4().hex
+    cache.set(VERSION_KEY_PREFIX + name, version, timeout=None)
+    return version
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_version_cache(app_configs, **kwargs):
+    """Hors DEBUG, les jetons de version doivent être partagés entre les workers"""
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.DEBUG or not backend.endswith(('LocMemCache', 'DummyCache')):
+        return []
+    return [checks.Error(
+        "Le cache par défaut est propre au processus: une invalidation (barème de quiz, "
+        "questionnaire, poids) ne serait vue que par le worker qui l'a émise.",
+        hint="Définir CACHE_REDIS_URL, ou DEBUG=True pour un serveur à processus unique.",
+        id='core.E001',
+    )]
+
+
+class TTLCache:
+    """Cache LRU borné avec expiration (ttl=None: sans expiration), local au processus"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        if self.ttl is not None:
+            ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl is not None and ttl <= 0:
+            return
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
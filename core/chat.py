@@ -0,0 +1,117 @@
+from django.db import transaction
+from django.db.models import Case, CharField, Count, DateTimeField, F, IntegerField, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import ChatMessage, Conversation
+
+
+def _unread_field(conversation_pair, reader_id):
+    return 'unread_low' if reader_id == conversation_pair[0] else 'unread_high'
+
+
+def record_message(message):
+    """Reporter un nouveau message dans la conversation de la paire
+
+    Aperçu, date et expéditeur ne sont remplacés que par un message plus
+    récent; le compteur de non-lus du destinataire est incrémenté en base.
+    """
+    pair = Conversation.pair(message.sender_id, message.recipient_id)
+    unread_field = _unread_field(pair, message.recipient_id)
+    preview = message.message[:Conversation.PREVIEW_LENGTH]
+
+    with transaction.atomic():
+        conversation, created = Conversation.objects.get_or_create(
+            user_low_id=pair[0],
+            user_high_id=pair[1],
+            defaults={
+                'last_message_preview': preview,
+                'last_message_at': message.created_at,
+                'last_sender_id': message.sender_id,
+                unread_field: 1,
+            }
+        )
+        if created:
+            return conversation
+
+        is_newer = Q(last_message_at__lte=message.created_at)
+        Conversation.objects.filter(pk=conversation.pk).update(
+            last_message_preview=Case(
+                When(is_newer, then=Value(preview)), default=F('last_message_preview'), output_field=CharField()
+            ),
+            last_sender_id=Case(
+                When(is_newer, then=Value(message.sender_id)), default=F('last_sender_id'), output_field=IntegerField()
+            ),
+            last_message_at=Case(
+                When(is_newer, then=Value(message.created_at)), default=F('last_message_at'), output_field=DateTimeField()
+            ),
+            **{unread_field: F(unread_field) + 1}
+        )
+    return conversation
+
+
+def history_page(user, other_user_id, after_id=None, before_id=None, limit=50):
+    """Page de l'historique d'une conversation, par ordre chronologique, en une requête
+
+    Pagination par clé sur (created_at, id): after_id retourne les messages
+    suivants (polling), before_id les messages précédents; sans curseur, les
+    plus récents. Les expéditeurs et destinataires sont joints.
+    """
+    messages = ChatMessage.objects.filter(
+        Q(sender=user, recipient_id=other_user_id) | Q(sender_id=other_user_id, recipient=user)
+    ).select_related('sender', 'recipient').only(
+        'sender__username', 'recipient__username', 'message', 'is_read', 'created_at'
+    )
+
+    cursor = after_id or before_id
+    if cursor:
+        # Date du message curseur; s'il a été supprimé, repli sur l'ordre des id
+        anchor = Coalesce(
+            Subquery(ChatMessage.objects.filter(pk=cursor).values('created_at')[:1]),
+            F('created_at'),
+        )
+        if after_id:
+            messages = messages.filter(Q(created_at__gt=anchor) | Q(created_at=anchor, id__gt=after_id))
+        else:
+            messages = messages.filter(Q(created_at__lt=anchor) | Q(created_at=anchor, id__lt=before_id))
+
+    if after_id:
+        return list(messages.order_by('created_at', 'id')[:limit])
+    return list(messages.order_by('-created_at', '-id')[:limit])[::-1]
+
+
+def mark_read(user, other_user_id):
+    """Marquer comme lus les messages reçus de other_user_id et remettre le compteur à zéro"""
+    pair = Conversation.pair(user.id, other_user_id)
+    with transaction.atomic():
+        ChatMessage.objects.filter(sender_id=other_user_id, recipient=user, is_read=False).update(is_read=True)
+        Conversation.objects.filter(user_low_id=pair[0], user_high_id=pair[1]).update(
+            **{_unread_field(pair, user.id): 0}
+        )
+
+
+def refresh_conversation(user_id, other_user_id):
+    """Recalculer la conversation d'une paire depuis ses messages (après une suppression)"""
+    pair = Conversation.pair(user_id, other_user_id)
+    messages = ChatMessage.objects.filter(
+        Q(sender_id=pair[0], recipient_id=pair[1]) | Q(sender_id=pair[1], recipient_id=pair[0])
+    )
+    last = messages.order_by('-created_at', '-id').first()
+    if last is None:
+        Conversation.objects.filter(user_low_id=pair[0], user_high_id=pair[1]).delete()
+        return
+
+    unread = messages.filter(is_read=False).aggregate(
+        low=Count('id', filter=Q(recipient_id=pair[0])),
+        high=Count('id', filter=Q(recipient_id=pair[1])),
+    )
+    Conversation.objects.update_or_create(
+        user_low_id=pair[0],
+        user_high_id=pair[1],
+        defaults={
+            'last_message_preview': last.message[:Conversation.PREVIEW_LENGTH],
+            'last_message_at': last.created_at,
+            'last_sender_id': last.sender_id,
+            'unread_low': unread['low'],
+            'unread_high': unread['high'],
+        }
+    )
@@ -2,6 +2,8 @@ import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from .chat import record_message
 from .models import ChatMessage
 
 User = get_user_model()
@@ -56,10 +58,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
     
     @database_sync_to_async
     def save_message(self, sender_id, recipient_id, message):
-        sender = User.objects.get(id=sender_id)
-        recipient = User.objects.get(id=recipient_id)
-        ChatMessage.objects.create(
-            sender=sender,
-            recipient=recipient,
-            message=message
-        )
+        with transaction.atomic():
+            chat_message = ChatMessage.objects.create(
+                sender_id=sender_id,
+                recipient_id=recipient_id,
+                message=message
+            )
+            record_message(chat_message)
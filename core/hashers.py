@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 dont le coût est réglé par PASSWORD_HASH_ITERATIONS
+
+    Même algorithme que le hasher par défaut: les hachages existants restent
+    valides et sont recalculés au coût courant à la connexion suivante.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
@@ -0,0 +1,82 @@
+import subprocess
+import sys
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+
+JOB_LOCK_PREFIX = 'elite:job:'
+
+# Commandes lancées par ce processus, pour libérer un verrou que le fils
+# n'a pas pu effacer (cache propre au processus en développement)
+_children = {}
+
+
+def job_log_path(name):
+    return settings.JOB_LOG_DIR / f'{name}.log'
+
+
+def release_job(name, token):
+    """Libérer le verrou d'une commande s'il appartient encore à cette exécution"""
+    if cache.get(JOB_LOCK_PREFIX + name) == token:
+        cache.delete(JOB_LOCK_PREFIX + name)
+
+
+def start_command(name, *args):
+    """Lancer manage.py <name> dans un processus détaché; False si elle tourne déjà
+
+    Le verrou (cache.add dans le cache partagé) est pris ici et transmis à la
+    commande par --job-token; elle le libère en se terminant. La sortie et
+    les erreurs sont ajoutées à JOB_LOG_DIR/<name>.log.
+    """
+    child = _children.get(name)
+    if child is not None and child.poll() is not None:
+        release_job(name, child.job_token)
+        del _children[name]
+
+    token = uuid.uuid4().hex
+    if not cache.add(JOB_LOCK_PREFIX + name, token, timeout=settings.JOB_LOCK_TIMEOUT):
+        return False
+
+    command = [sys.executable, str(settings.BASE_DIR / 'manage.py'), name, *args, f'--job-token={token}']
+    try:
+        settings.JOB_LOG_DIR.mkdir(parents=True, exist_ok=True)
+        with open(job_log_path(name), 'a', encoding='utf-8') as log:
+            log.write(f"=== {timezone.now().isoformat()} manage.py {' '.join([name, *args])}\n")
+            log.flush()
+            child = subprocess.Popen(
+                command,
+                cwd=settings.BASE_DIR,
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+            )
+    except OSError:
+        release_job(name, token)
+        raise
+
+    child.job_token = token
+    _children[name] = child
+    return True
+
+
+@contextmanager
+def job_lock(name, token=None):
+    """Verrou d'une commande longue, libéré à la fin même en cas d'erreur
+
+    token: verrou déjà pris par start_command. Sans token (lancement manuel),
+    la commande le prend elle-même et échoue si une exécution est en cours.
+    """
+    if token is None:
+        token = uuid.uuid4().hex
+        if not cache.add(JOB_LOCK_PREFIX + name, token, timeout=settings.JOB_LOCK_TIMEOUT):
+            raise CommandError(f"{name} est déjà en cours d'exécution")
+    try:
+        yield
+    finally:
+        release_job(name, token)
@@ -0,0 +1,233 @@
+import bisect
+import threading
+
+from django.conf import settings
+from django.core import checks
+from django.db import transaction
+
+from .models import User
+
+
+class RedisLeaderboard:
+    """Classement des ambassadeurs dans un ZSET Redis: rang en O(log n)
+
+    Membres: identifiants utilisateur, scores: referral_points. Seuls les
+    utilisateurs ayant des points sont classés.
+    """
+
+    def __init__(self, url, key):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.key = key
+
+    def set_score(self, user_id, points):
+        if points > 0:
+            self.client.zadd(self.key, {user_id: points})
+        else:
+            self.client.zrem(self.key, user_id)
+
+    def incr(self, user_id, amount):
+        if self.client.zincrby(self.key, amount, user_id) <= 0:
+            self.client.zrem(self.key, user_id)
+
+    def remove(self, user_id):
+        self.client.zrem(self.key, user_id)
+
+    def rank(self, user_id):
+        """Rang à partir de 0 (None si non classé)"""
+        return self.client.zrevrank(self.key, user_id)
+
+    def score(self, user_id):
+        points = self.client.zscore(self.key, user_id)
+        return None if points is None else int(points)
+
+    def range(self, start, stop):
+        """Entrées [start, stop] du classement: liste de (user_id, points)"""
+        return [
+            (int(member), int(points))
+            for member, points in self.client.zrevrange(self.key, start, stop, withscores=True)
+        ]
+
+    def size(self):
+        return self.client.zcard(self.key)
+
+    def replace(self, scores):
+        """Remplacer tout le classement: construit à part puis échangé par RENAME"""
+        staging = f'{self.key}:rebuild'
+        self.client.delete(staging)
+        batch = {}
+        count = 0
+        for user_id, points in scores:
+            batch[user_id] = points
+            if len(batch) >= 10000:
+                self.client.zadd(staging, batch)
+                count += len(batch)
+                batch = {}
+        if batch:
+            self.client.zadd(staging, batch)
+            count += len(batch)
+        if count:
+            self.client.rename(staging, self.key)
+        else:
+            self.client.delete(self.key)
+        return count
+
+
+class MemoryLeaderboard:
+    """Équivalent en mémoire du ZSET pour le développement et les tests
+
+    Liste triée de (points, membre) comme Redis: mêmes rangs, mêmes ex aequo
+    (ordre lexicographique des membres). Propre au processus et chargée
+    depuis la table User au premier accès.
+    """
+
+    def __init__(self):
+        self._entries = None
+        self._scores = {}
+        self._lock = threading.RLock()
+
+    def _load(self):
+        if self._entries is None:
+            self.replace(
+                User.objects.filter(referral_points__gt=0).values_list('id', 'referral_points').iterator()
+            )
+
+    def _discard(self, member):
+        points = self._scores.pop(member, None)
+        if points is not None:
+            del self._entries[bisect.bisect_left(self._entries, (points, member))]
+
+    def set_score(self, user_id, points):
+        with self._lock:
+            self._load()
+            member = str(user_id)
+            self._discard(member)
+            if points > 0:
+                self._scores[member] = points
+                bisect.insort(self._entries, (points, member))
+
+    def incr(self, user_id, amount):
+        with self._lock:
+            if self._entries is None:
+                # Appelé après commit: le chargement lit déjà le solde incrémenté
+                self._load()
+                return
+            self.set_score(user_id, self._scores.get(str(user_id), 0) + amount)
+
+    def remove(self, user_id):
+        with self._lock:
+            self._load()
+            self._discard(str(user_id))
+
+    def rank(self, user_id):
+        with self._lock:
+            self._load()
+            member = str(user_id)
+            points = self._scores.get(member)
+            if points is None:
+                return None
+            return len(self._entries) - 1 - bisect.bisect_left(self._entries, (points, member))
+
+    def score(self, user_id):
+        with self._lock:
+            self._load()
+            return self._scores.get(str(user_id))
+
+    def range(self, start, stop):
+        with self._lock:
+            self._load()
+            size = len(self._entries)
+            stop = min(stop, size - 1)
+            return [
+                (int(member), points)
+                for points, member in (self._entries[size - 1 - index] for index in range(start, stop + 1))
+            ]
+
+    def size(self):
+        with self._lock:
+            self._load()
+            return len(self._entries)
+
+    def replace(self, scores):
+        scores = {str(user_id): points for user_id, points in scores if points > 0}
+        with self._lock:
+            self._scores = scores
+            self._entries = sorted((points, member) for member, points in scores.items())
+        return len(scores)
+
+
+_leaderboard = None
+_leaderboard_lock = threading.Lock()
+
+
+def get_leaderboard():
+    """Classement du processus: Redis si LEADERBOARD_REDIS_URL est défini, sinon en mémoire"""
+    global _leaderboard
+    if _leaderboard is None:
+        with _leaderboard_lock:
+            if _leaderboard is None:
+                if settings.LEADERBOARD_REDIS_URL:
+                    _leaderboard = RedisLeaderboard(settings.LEADERBOARD_REDIS_URL, settings.LEADERBOARD_KEY)
+                else:
+                    _leaderboard = MemoryLeaderboard()
+    return _leaderboard
+
+
+@checks.register()
+def check_shared_leaderboard(app_configs, **kwargs):
+    """Hors DEBUG, le classement doit être partagé entre les workers"""
+    if settings.DEBUG or settings.LEADERBOARD_REDIS_URL:
+        return []
+    return [checks.Error(
+        "Le classement des ambassadeurs est en mémoire: chaque worker garde sa propre copie, "
+        "les rangs divergent et rebuild_leaderboard n'a aucun effet sur les workers.",
+        hint="Définir LEADERBOARD_REDIS_URL, ou DEBUG=True pour un serveur à processus unique.",
+        id='core.E002',
+    )]
+
+
+def update_score(user_id, points):
+    """Reporter un solde de points connu dans le classement, après commit"""
+    transaction.on_commit(lambda: get_leaderboard().set_score(user_id, points), robust=True)
+
+
+def add_points(user_id, amount):
+    """Reporter un incrément de points (UPDATE F() sans relecture), après commit"""
+    transaction.on_commit(lambda: get_leaderboard().incr(user_id, amount), robust=True)
+
+
+def rebuild_leaderboard():
+    """Reconstruire le classement depuis la table User; retourne le nombre d'utilisateurs classés"""
+    scores = User.objects.filter(referral_points__gt=0).values_list('id', 'referral_points')
+    return get_leaderboard().replace(scores.iterator(chunk_size=10000))
+
+
+def _with_usernames(rows, first_rank):
+    """Ajouter rang (à partir de 1) et nom d'utilisateur, en une requête"""
+    usernames = dict(User.objects.filter(pk__in=[user_id for user_id, points in rows]).values_list('id', 'username'))
+    return [
+        {'rank': first_rank + index, 'user_id': user_id, 'username': usernames.get(user_id), 'points': points}
+        for index, (user_id, points) in enumerate(rows)
+    ]
+
+
+def top(limit):
+    """Les meilleurs ambassadeurs"""
+    return _with_usernames(get_leaderboard().range(0, limit - 1), 1)
+
+
+def user_standing(user_id, radius):
+    """Rang d'un utilisateur et ses voisins directs au classement"""
+    leaderboard = get_leaderboard()
+    rank = leaderboard.rank(user_id)
+    if rank is None:
+        return {'rank': None, 'points': 0, 'ranked_users': leaderboard.size(), 'neighbours': []}
+
+    start = max(rank - radius, 0)
+    return {
+        'rank': rank + 1,
+        'points': leaderboard.score(user_id),
+        'ranked_users': leaderboard.size(),
+        'neighbours': _with_usernames(leaderboard.range(start, rank + radius), start + 1),
+    }
@@ -0,0 +1,53 @@
+import argparse
+import csv
+import os
+
+from django.core.management.base import BaseCommand
+
+from core.jobs import job_lock
+from core.user_import import import_users
+
+
+class Command(BaseCommand):
+    help = "Importer des élèves depuis un CSV (username, email, password, first_name, last_name, phone, city, academic_level, referral_code)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help="Fichier CSV UTF-8 avec ligne d'en-tête")
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help="Nombre de lignes validées et insérées par paquet")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Nombre de processus de hachage (par défaut: nombre de CPU)")
+        parser.add_argument('--report', default=None,
+                            help="Fichier CSV où écrire les lignes rejetées (par défaut: sortie standard)")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Valider le fichier sans créer d'utilisateurs")
+        parser.add_argument('--remove-csv', action='store_true',
+                            help="Supprimer le CSV (mots de passe en clair) une fois l'import terminé")
+        parser.add_argument('--job-token', default=None, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        try:
+            with job_lock('import_users', options['job_token']):
+                with open(options['csv_path'], newline='', encoding='utf-8-sig') as lines:
+                    created, errors = import_users(
+                        lines,
+                        chunk_size=options['chunk_size'],
+                        workers=options['workers'],
+                        dry_run=options['dry_run'],
+                    )
+        finally:
+            if options['remove_csv']:
+                os.remove(options['csv_path'])
+
+        if errors:
+            report = open(options['report'], 'w', newline='', encoding='utf-8') if options['report'] else self.stdout
+            writer = csv.writer(report)
+            writer.writerow(['line', 'username', 'field', 'error'])
+            for error in errors:
+                for field, message in error['errors'].items():
+                    writer.writerow([error['line'], error['username'], field, message])
+            if options['report']:
+                report.close()
+
+        verb = "valides" if options['dry_run'] else "créés"
+        self.stdout.write(self.style.SUCCESS(f"{created} utilisateurs {verb}, {len(errors)} lignes rejetées"))
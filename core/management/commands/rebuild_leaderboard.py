@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.leaderboard import rebuild_leaderboard
+
+
+class Command(BaseCommand):
+    help = "Reconstruire le classement des ambassadeurs à partir des points de la table User"
+
+    def handle(self, *args, **options):
+        if not settings.LEADERBOARD_REDIS_URL:
+            # Le classement en mémoire appartient à chaque worker: le reconstruire ici serait sans effet
+            raise CommandError(
+                "Classement en mémoire (LEADERBOARD_REDIS_URL non défini): chaque worker le recharge "
+                "depuis la base au premier accès, rien à reconstruire"
+            )
+        ranked = rebuild_leaderboard()
+        self.stdout.write(self.style.SUCCESS(f"{ranked} utilisateurs classés"))
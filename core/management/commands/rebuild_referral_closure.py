@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.referrals import rebuild_referral_closure
+
+
+class Command(BaseCommand):
+    help = "Reconstruire la table de fermeture de l'arbre de parrainage à partir de referred_by"
+
+    def handle(self, *args, **options):
+        paths = rebuild_referral_closure()
+        self.stdout.write(self.style.SUCCESS(f"{paths} liens ancêtre-descendant créés"))
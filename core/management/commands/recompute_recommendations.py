@@ -0,0 +1,26 @@
+import argparse
+
+from django.core.management.base import BaseCommand
+
+from core.jobs import job_lock
+from core.matching import recompute_recommendations
+
+
+class Command(BaseCommand):
+    help = "Recalculer les profils recommandés de tous les utilisateurs après une modification des poids"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help="Nombre d'utilisateurs traités par paquet")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Nombre de processus de scoring (par défaut: nombre de CPU)")
+        parser.add_argument('--job-token', default=None, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        # Deux recalculs simultanés écriraient les mêmes rangs (unique_together)
+        with job_lock('recompute_recommendations', options['job_token']):
+            processed = recompute_recommendations(
+                chunk_size=options['chunk_size'],
+                workers=options['workers'],
+            )
+        self.stdout.write(self.style.SUCCESS(f"{processed} utilisateurs recalculés"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.referrals import repair_referral_counts
+
+
+class Command(BaseCommand):
+    help = "Réaligner le compteur referral_count de chaque utilisateur sur ses filleuls réels"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Lister les compteurs faux sans les corriger")
+
+    def handle(self, *args, **options):
+        drifted = repair_referral_counts(dry_run=options['dry_run'])
+        verb = "à corriger" if options['dry_run'] else "corrigés"
+        self.stdout.write(self.style.SUCCESS(f"{len(drifted)} compteurs {verb}"))
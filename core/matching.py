@@ -0,0 +1,245 @@
+import os
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Prefetch, Sum
+from rest_framework.renderers import JSONRenderer
+
+from .cache import get_version, bump_version
+from .models import (
+    MatchingQuestion, MatchingAnswer, MatchingAnswerWeight, UserMatchingResponse, UserProfileRecommendation
+)
+from .serializers import MatchingQuestionSerializer
+
+
+MATCHING_VERSION = 'matching'
+QUESTIONNAIRE_VERSION = 'questionnaire'
+QUESTIONNAIRE_CACHE_PREFIX = 'elite:questionnaire:'
+RECOMMENDED_PROFILES_COUNT = 3
+
+
+class MatchingScorer:
+    """Matrice réponses × profils compilée à partir des MatchingAnswer actives"""
+
+    def __init__(self, version, answer_ids, profile_ids, weights, present):
+        self.version = version
+        self.profile_ids = np.asarray(profile_ids, dtype=np.int64)
+        self.answer_index = {answer_id: row for row, answer_id in enumerate(answer_ids)}
+        self.weights = weights
+        self.present = present
+
+    @classmethod
+    def build(cls, version):
+        answer_ids = list(
+            MatchingAnswer.objects.filter(question__is_active=True).order_by('id').values_list('id', flat=True)
+        )
+        rows = list(
+            MatchingAnswerWeight.objects.filter(answer__question__is_active=True)
+            .values_list('answer_id', 'profile_id', 'weight')
+        )
+        profile_ids = sorted({profile_id for _, profile_id, _ in rows})
+        row_of = {answer_id: row for row, answer_id in enumerate(answer_ids)}
+        column = {profile_id: col for col, profile_id in enumerate(profile_ids)}
+
+        weights = np.zeros((len(answer_ids), len(profile_ids)), dtype=np.int64)
+        present = np.zeros((len(answer_ids), len(profile_ids)), dtype=bool)
+        for answer_id, profile_id, weight in rows:
+            row = row_of.get(answer_id)
+            if row is not None:
+                weights[row, column[profile_id]] = weight
+                present[row, column[profile_id]] = True
+
+        return cls(version, answer_ids, profile_ids, weights, present)
+
+    def rows_for(self, answer_ids):
+        return [self.answer_index[a] for a in answer_ids if a in self.answer_index]
+
+    def top_scores(self, answer_ids, limit=RECOMMENDED_PROFILES_COUNT):
+        """Paires (profile_id, score) des profils les mieux notés, du meilleur au moins bon"""
+        rows = self.rows_for(answer_ids)
+        if not rows or not len(self.profile_ids):
+            return []
+
+        scores = self.weights[rows].sum(axis=0)
+        # Seuls les profils pondérés par au moins une réponse sont candidats
+        candidates = np.flatnonzero(self.present[rows].any(axis=0))
+        order = candidates[np.argsort(-scores[candidates], kind='stable')][:limit]
+        return list(zip(self.profile_ids[order].tolist(), scores[order].tolist()))
+
+    def top_profiles(self, answer_ids, limit=RECOMMENDED_PROFILES_COUNT):
+        """Identifiants des profils les mieux notés, du meilleur au moins bon"""
+        return [profile_id for profile_id, _ in self.top_scores(answer_ids, limit)]
+
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+
+def weights_version():
+    """Version courante des poids de correspondance"""
+    return get_version(MATCHING_VERSION)
+
+
+def get_scorer():
+    """Moteur de scoring du processus, reconstruit quand la version change"""
+    global _scorer
+    version = weights_version()
+    scorer = _scorer
+    if scorer is not None and scorer.version == version:
+        return scorer
+
+    with _scorer_lock:
+        if _scorer is None or _scorer.version != version:
+            _scorer = MatchingScorer.build(version)
+        return _scorer
+
+
+def invalidate_scorer():
+    bump_version(MATCHING_VERSION)
+
+
+def score_user(user, limit=RECOMMENDED_PROFILES_COUNT):
+    """Scoring en base: SUM(poids) GROUP BY profil sur les réponses de l'utilisateur"""
+    rows = (
+        MatchingAnswerWeight.objects.filter(
+            answer__in=UserMatchingResponse.objects.filter(user=user).values('selected_answer'),
+            answer__question__is_active=True,
+        )
+        .values('profile_id')
+        .annotate(score=Sum('weight'))
+        .order_by('-score', 'profile_id')[:limit]
+    )
+    return [(row['profile_id'], row['score']) for row in rows]
+
+
+def store_recommendations(version, results):
+    """Remplacer les recommandations persistées des utilisateurs donnés
+
+    results: liste de (user_id, [(profile_id, score), ...]) par rang croissant
+    """
+    recommendations = [
+        UserProfileRecommendation(
+            user_id=user_id,
+            profile_id=profile_id,
+            rank=rank,
+            score=score,
+            weights_version=version,
+        )
+        for user_id, scores in results
+        for rank, (profile_id, score) in enumerate(scores, start=1)
+    ]
+    with transaction.atomic():
+        UserProfileRecommendation.objects.filter(user_id__in=[user_id for user_id, _ in results]).delete()
+        UserProfileRecommendation.objects.bulk_create(recommendations)
+
+
+def iter_user_answers(chunk_size):
+    """Parcourir les réponses par paquets d'utilisateurs, sans tout charger en mémoire"""
+    last_user_id = 0
+    while True:
+        user_ids = list(
+            UserMatchingResponse.objects.filter(user_id__gt=last_user_id)
+            .order_by('user_id')
+            .values_list('user_id', flat=True)
+            .distinct()[:chunk_size]
+        )
+        if not user_ids:
+            return
+
+        answers = defaultdict(list)
+        rows = UserMatchingResponse.objects.filter(
+            user_id__gt=last_user_id, user_id__lte=user_ids[-1]
+        ).values_list('user_id', 'selected_answer_id')
+        for user_id, answer_id in rows:
+            answers[user_id].append(answer_id)
+
+        yield [(user_id, answers[user_id]) for user_id in user_ids]
+        last_user_id = user_ids[-1]
+
+
+_worker_scorer = None
+
+
+def _init_worker(scorer):
+    global _worker_scorer
+    _worker_scorer = scorer
+
+
+def _score_chunk(chunk):
+    return [(user_id, _worker_scorer.top_scores(answer_ids)) for user_id, answer_ids in chunk]
+
+
+def recompute_recommendations(chunk_size=1000, workers=None):
+    """Recalculer les recommandations de tous les utilisateurs ayant répondu au formulaire
+
+    Le scoring des paquets est réparti sur un pool de processus; le processus
+    principal lit les réponses et écrit les résultats. Retourne le nombre
+    d'utilisateurs traités.
+    """
+    scorer = get_scorer()
+    workers = workers or os.cpu_count() or 1
+    processed = 0
+
+    def save(results):
+        nonlocal processed
+        store_recommendations(scorer.version, results)
+        processed += len(results)
+
+    if workers == 1:
+        for chunk in iter_user_answers(chunk_size):
+            save([(user_id, scorer.top_scores(answer_ids)) for user_id, answer_ids in chunk])
+        return processed
+
+    # Les processus fils ne doivent pas hériter des connexions ouvertes
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(scorer,)) as pool:
+        pending = deque()
+        for chunk in iter_user_answers(chunk_size):
+            pending.append(pool.submit(_score_chunk, chunk))
+            # Borner le nombre de paquets en vol pour garder une mémoire constante
+            if len(pending) >= workers * 2:
+                save(pending.popleft().result())
+        while pending:
+            save(pending.popleft().result())
+
+    return processed
+
+
+_questionnaire = (None, None)
+
+
+def render_questionnaire():
+    """Questionnaire actif complet, sérialisé une seule fois en JSON"""
+    questions = MatchingQuestion.objects.filter(is_active=True).prefetch_related(
+        Prefetch('answers', queryset=MatchingAnswer.objects.order_by('id'))
+    )
+    return JSONRenderer().render(MatchingQuestionSerializer(questions, many=True).data)
+
+
+def get_questionnaire():
+    """(version, JSON) du questionnaire, reconstruit seulement après une modification
+
+    Le document est gardé en mémoire du processus et partagé entre workers
+    via le cache Django.
+    """
+    global _questionnaire
+    version = get_version(QUESTIONNAIRE_VERSION)
+    if _questionnaire[0] == version:
+        return _questionnaire
+
+    key = QUESTIONNAIRE_CACHE_PREFIX + version
+    content = cache.get(key)
+    if content is None:
+        content = render_questionnaire()
+        cache.set(key, content, timeout=None)
+
+    _questionnaire = (version, content)
+    return _questionnaire
+
+
+def invalidate_questionnaire():
+    bump_version(QUESTIONNAIRE_VERSION)
@@ -1,11 +1,25 @@
-from django.shortcuts import redirect
-from django.urls import reverse
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.http import JsonResponse
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from .authentication import CachedJWTAuthentication
+from .models import User
 
 class MatchingFormMiddleware:
-    """Middleware pour bloquer l'accès tant que le formulaire de correspondance n'est pas complété"""
+    """Middleware pour bloquer l'accès tant que le formulaire de correspondance n'est pas complété
+
+    L'état du formulaire est lu dans les claims du jeton d'accès signé, sans
+    requête en base pour les utilisateurs qui l'ont complété. Un claim False
+    peut être périmé (jeton rafraîchi depuis un refresh émis avant la fin du
+    formulaire): il est alors vérifié en base. Compatible sync et async: sous ASGI, les vues
+    asynchrones ne sont pas repoussées sur un thread.
+    """
+    
+    sync_capable = True
+    async_capable = True
     
-    EXEMPT_URLS = [
+    EXEMPT_URLS = (
         '/api/auth/',
         '/api/register/',
         '/api/matching/',
@@ -13,23 +27,66 @@ class MatchingFormMiddleware:
         '/admin/',
         '/static/',
         '/media/',
-    ]
+    )
     
     def __init__(self, get_response):
         self.get_response = get_response
+        self.authenticator = CachedJWTAuthentication()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
     
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        
         # Vérifier si l'URL est exemptée
-        if any(request.path.startswith(url) for url in self.EXEMPT_URLS):
+        if request.path.startswith(self.EXEMPT_URLS):
             return self.get_response(request)
         
-        # Vérifier si l'utilisateur est authentifié
-        if request.user.is_authenticated:
-            # Vérifier si le formulaire de correspondance est complété
-            if not request.user.has_completed_matching and not request.path.startswith('/api/matching/'):
-                return JsonResponse(
-                    {'error': 'Vous devez compléter le formulaire de correspondance avant d\'accéder à cette ressource'},
-                    status=403
-                )
+        token = self.get_validated_token(request)
+        if token is not None and not self.has_completed_matching(token):
+            return self.forbidden()
         
         return self.get_response(request)
+    
+    async def __acall__(self, request):
+        if request.path.startswith(self.EXEMPT_URLS):
+            return await self.get_response(request)
+        
+        token = self.get_validated_token(request)
+        if token is not None and not await self.ahas_completed_matching(token):
+            return self.forbidden()
+        
+        return await self.get_response(request)
+    
+    def forbidden(self):
+        return JsonResponse(
+            {'error': 'Vous devez compléter le formulaire de correspondance avant d\'accéder à cette ressource'},
+            status=403
+        )
+    
+    def get_validated_token(self, request):
+        """Jeton d'accès vérifié, ou None (l'authentification DRF répondra 401)"""
+        header = self.authenticator.get_header(request)
+        raw_token = self.authenticator.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+        try:
+            return self.authenticator.get_validated_token(raw_token)
+        except (InvalidToken, TokenError):
+            return None
+    
+    def has_completed_matching(self, token):
+        if token.get('has_completed_matching'):
+            return True
+        # Claim absent (jeton ancien) ou False, peut-être périmé
+        return User.objects.filter(
+            id=token.get(api_settings.USER_ID_CLAIM), has_completed_matching=True
+        ).exists()
+    
+    async def ahas_completed_matching(self, token):
+        if token.get('has_completed_matching'):
+            return True
+        return await User.objects.filter(
+            id=token.get(api_settings.USER_ID_CLAIM), has_completed_matching=True
+        ).aexists()
@@ -0,0 +1,72 @@
+# Generated by Django 5.0.1 on 2026-10-17 17:29
+
+import json
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_json_weights(apps, schema_editor):
+    """Convertir profile_weights (dict, parfois chaîne JSON) en lignes MatchingAnswerWeight"""
+    MatchingAnswer = apps.get_model('core', 'MatchingAnswer')
+    MatchingAnswerWeight = apps.get_model('core', 'MatchingAnswerWeight')
+    Profile = apps.get_model('core', 'Profile')
+    
+    profile_ids = set(Profile.objects.values_list('id', flat=True))
+    rows = []
+    for answer in MatchingAnswer.objects.all().iterator():
+        weights = answer.profile_weights
+        if isinstance(weights, str):
+            try:
+                weights = json.loads(weights)
+            except json.JSONDecodeError:
+                weights = {}
+        if not isinstance(weights, dict):
+            weights = {}
+        
+        normalized = {}
+        for profile_id, score in weights.items():
+            try:
+                profile_id, score = int(profile_id), int(score)
+            except (ValueError, TypeError):
+                continue
+            if profile_id in profile_ids:
+                normalized[profile_id] = score
+        
+        rows.extend(
+            MatchingAnswerWeight(answer_id=answer.id, profile_id=profile_id, weight=score)
+            for profile_id, score in normalized.items()
+        )
+        # La copie JSON reflète désormais exactement les lignes créées
+        answer.profile_weights = {str(profile_id): score for profile_id, score in sorted(normalized.items())}
+        answer.save(update_fields=['profile_weights'])
+    
+    MatchingAnswerWeight.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_user_profile_recommendation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='matchinganswer',
+            name='profile_weights',
+            field=models.JSONField(default=dict, editable=False, help_text="Copie en lecture seule des poids {'profile_id': score}, dérivée de MatchingAnswerWeight"),
+        ),
+        migrations.CreateModel(
+            name='MatchingAnswerWeight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weight', models.IntegerField()),
+                ('answer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weights', to='core.matchinganswer')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_weights', to='core.profile')),
+            ],
+            options={
+                'unique_together': {('answer', 'profile')},
+            },
+        ),
+        migrations.RunPython(copy_json_weights, migrations.RunPython.noop),
+    ]
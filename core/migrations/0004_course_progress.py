@@ -0,0 +1,73 @@
+# Generated by Django 5.0.1 on 2026-10-17 17:35
+
+import django.core.validators
+from itertools import groupby
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fold_chapter_progress(apps, schema_editor):
+    """Regrouper les lignes ChapterProgress en une ligne CourseProgress par (utilisateur, pack)"""
+    ChapterProgress = apps.get_model('core', 'ChapterProgress')
+    CourseProgress = apps.get_model('core', 'CourseProgress')
+    
+    rows = ChapterProgress.objects.order_by('user_id', 'chapter__course_pack_id').values_list(
+        'user_id', 'chapter__course_pack_id', 'chapter__order', 'status'
+    )
+    batch = []
+    for (user_id, course_pack_id), chapters in groupby(rows.iterator(), key=lambda row: row[:2]):
+        bitmap = bytearray()
+        current_order = None
+        for _, _, order, status in chapters:
+            if order < 0:
+                continue
+            if status == 'COMPLETED':
+                if order >> 3 >= len(bitmap):
+                    bitmap.extend(bytes((order >> 3) + 1 - len(bitmap)))
+                bitmap[order >> 3] |= 1 << (order & 7)
+            elif status == 'IN_PROGRESS' and (current_order is None or order > current_order):
+                current_order = order
+        
+        batch.append(CourseProgress(
+            user_id=user_id,
+            course_pack_id=course_pack_id,
+            completed_chapters=bytes(bitmap),
+            current_chapter_order=current_order,
+        ))
+        if len(batch) >= 1000:
+            CourseProgress.objects.bulk_create(batch)
+            batch = []
+    CourseProgress.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_matching_answer_weight'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chapter',
+            name='order',
+            field=models.IntegerField(default=0, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.CreateModel(
+            name='CourseProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_chapters', models.BinaryField(default=b'')),
+                ('current_chapter_order', models.IntegerField(blank=True, null=True)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course_pack', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.coursepack')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_progress', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'course_pack')},
+            },
+        ),
+        migrations.RunPython(fold_chapter_progress, migrations.RunPython.noop),
+    ]
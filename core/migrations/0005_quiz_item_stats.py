@@ -0,0 +1,43 @@
+# Generated by Django 5.0.1 on 2026-10-17 17:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_course_progress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizChoiceStats',
+            fields=[
+                ('choice', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.quizchoice')),
+                ('selections', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Quiz choice stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='QuizQuestionStats',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.quizquestion')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('correct', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('score_sq_sum', models.FloatField(default=0)),
+                ('correct_score_sum', models.FloatField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Quiz question stats',
+            },
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='selected_choices',
+            field=models.BinaryField(default=b'', help_text="Identifiants des choix (uint32, 0 = sans réponse) dans l'ordre des questions"),
+        ),
+    ]
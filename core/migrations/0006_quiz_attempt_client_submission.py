@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-17 17:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_quiz_item_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='client_submission_id',
+            field=models.UUIDField(blank=True, help_text="Identifiant d'idempotence (synchro hors ligne)", null=True),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='client_submitted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='quizattempt',
+            unique_together={('user', 'client_submission_id')},
+        ),
+    ]
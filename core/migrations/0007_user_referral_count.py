@@ -0,0 +1,34 @@
+# Generated by Django 5.0.1 on 2026-10-17 17:42
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_referral_count(apps, schema_editor):
+    """Initialiser le compteur à partir des filleuls existants, en une requête"""
+    User = apps.get_model('core', 'User')
+    counts = (
+        User.objects.filter(referred_by=OuterRef('pk'))
+        .order_by()
+        .values('referred_by')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    User.objects.update(referral_count=Coalesce(Subquery(counts), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_quiz_attempt_client_submission'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='referral_count',
+            field=models.PositiveIntegerField(default=0, help_text="Nombre de filleuls, maintenu par UPDATE atomique à l'inscription"),
+        ),
+        migrations.RunPython(backfill_referral_count, migrations.RunPython.noop),
+    ]
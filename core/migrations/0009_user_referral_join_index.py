@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-17 17:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0008_referral_path'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['referred_by', 'date_joined'], name='core_user_referre_f1fea6_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.0.1 on 2026-10-17 17:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_conversations(apps, schema_editor):
+    """Créer les conversations à partir de l'historique des messages"""
+    ChatMessage = apps.get_model('core', 'ChatMessage')
+    Conversation = apps.get_model('core', 'Conversation')
+    
+    conversations = {}
+    for message in ChatMessage.objects.order_by('created_at', 'id').iterator():
+        pair = (min(message.sender_id, message.recipient_id), max(message.sender_id, message.recipient_id))
+        conversation = conversations.setdefault(pair, Conversation(user_low_id=pair[0], user_high_id=pair[1]))
+        conversation.last_message_preview = message.message[:120]
+        conversation.last_message_at = message.created_at
+        conversation.last_sender_id = message.sender_id
+        if not message.is_read:
+            if message.recipient_id == pair[0]:
+                conversation.unread_low += 1
+            else:
+                conversation.unread_high += 1
+    
+    Conversation.objects.bulk_create(conversations.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_user_referral_join_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_preview', models.CharField(blank=True, max_length=120)),
+                ('last_message_at', models.DateTimeField()),
+                ('unread_low', models.PositiveIntegerField(default=0, help_text='Messages non lus par user_low')),
+                ('unread_high', models.PositiveIntegerField(default=0, help_text='Messages non lus par user_high')),
+                ('last_sender', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user_high', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user_low', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_low', '-last_message_at'], name='core_conver_user_lo_940599_idx'), models.Index(fields=['user_high', '-last_message_at'], name='core_conver_user_hi_31c52d_idx')],
+                'unique_together': {('user_low', 'user_high')},
+            },
+        ),
+        migrations.RunPython(build_conversations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-17 17:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_conversation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['sender', 'recipient', 'created_at', 'id'], name='core_chatme_sender__dc33c1_idx'),
+        ),
+    ]
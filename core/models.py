@@ -1,5 +1,6 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 import uuid
 
@@ -17,9 +18,13 @@ class User(AbstractUser):
     referral_code = models.CharField(max_length=12, unique=True, blank=True)
     referred_by = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='referrals')
     referral_points = models.IntegerField(default=0)
+    referral_count = models.PositiveIntegerField(default=0, help_text="Nombre de filleuls, maintenu par UPDATE atomique à l'inscription")
     has_completed_matching = models.BooleanField(default=False)
     selected_profile = models.ForeignKey('Profile', on_delete=models.SET_NULL, null=True, blank=True)
     
+    class Meta(AbstractUser.Meta):
+        indexes = [models.Index(fields=['referred_by', 'date_joined'])]
+    
     def save(self, *args, **kwargs):
         if not self.referral_code:
             self.referral_code = str(uuid.uuid4())[:12].upper()
@@ -47,10 +52,44 @@ class MatchingAnswer(models.Model):
     """Réponses possibles aux questions de correspondance"""
     question = models.ForeignKey(MatchingQuestion, on_delete=models.CASCADE, related_name='answers')
     text = models.TextField()
-    profile_weights = models.JSONField(default=dict, help_text="Poids pour chaque profil {'profile_id': score}")
+    profile_weights = models.JSONField(
+        default=dict, editable=False,
+        help_text="Copie en lecture seule des poids {'profile_id': score}, dérivée de MatchingAnswerWeight"
+    )
     
     def __str__(self):
         return f"{self.question} - {self.text[:50]}"
+    
+    def set_weights(self, weights):
+        """Remplacer les poids de la réponse à partir d'un dict {profile_id: score}"""
+        try:
+            parsed = {int(profile_id): int(score) for profile_id, score in weights.items()}
+        except (AttributeError, ValueError, TypeError):
+            raise ValidationError("Les poids doivent être un dictionnaire {profile_id: score entier}")
+        
+        unknown = set(parsed) - set(Profile.objects.filter(id__in=parsed).values_list('id', flat=True))
+        if unknown:
+            raise ValidationError(f"Profils inconnus: {sorted(unknown)}")
+        
+        from .matching import invalidate_scorer
+        
+        # bulk_create et update() n'émettent pas de signaux: invalider le scoring ici
+        with transaction.atomic():
+            self.weights.all().delete()
+            MatchingAnswerWeight.objects.bulk_create([
+                MatchingAnswerWeight(answer=self, profile_id=profile_id, weight=score)
+                for profile_id, score in parsed.items()
+            ])
+            self.refresh_profile_weights()
+            transaction.on_commit(invalidate_scorer)
+    
+    def refresh_profile_weights(self):
+        """Régénérer la copie JSON à partir de la table des poids"""
+        self.profile_weights = {
+            str(profile_id): weight
+            for profile_id, weight in self.weights.order_by('profile_id').values_list('profile_id', 'weight')
+        }
+        MatchingAnswer.objects.filter(pk=self.pk).update(profile_weights=self.profile_weights)
 
 
 class UserMatchingResponse(models.Model):
@@ -76,6 +115,36 @@ class Profile(models.Model):
         return self.name
 
 
+class MatchingAnswerWeight(models.Model):
+    """Poids d'une réponse pour un profil, source du scoring de correspondance"""
+    answer = models.ForeignKey(MatchingAnswer, on_delete=models.CASCADE, related_name='weights')
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='answer_weights')
+    weight = models.IntegerField()
+    
+    class Meta:
+        unique_together = ['answer', 'profile']
+    
+    def __str__(self):
+        return f"{self.answer} - {self.profile.name}: {self.weight}"
+
+
+class UserProfileRecommendation(models.Model):
+    """Profils recommandés à un utilisateur, recalculés quand les poids changent"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='profile_recommendations')
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE)
+    rank = models.PositiveSmallIntegerField()
+    score = models.IntegerField()
+    weights_version = models.CharField(max_length=32)
+    computed_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['user', 'rank']
+        unique_together = ['user', 'rank']
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.rank}. {self.profile.name}"
+
+
 class AdaptivePath(models.Model):
     """Parcours adaptatif par profil et niveau"""
     profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='paths')
@@ -118,7 +187,7 @@ class Chapter(models.Model):
     """Chapitres d'un pack de cours"""
     course_pack = models.ForeignKey(CoursePack, on_delete=models.CASCADE, related_name='chapters')
     title = models.CharField(max_length=200)
-    order = models.IntegerField(default=0)
+    order = models.IntegerField(default=0, validators=[MinValueValidator(0)])
     content_text = models.TextField(blank=True)
     video_url = models.URLField(blank=True)
     
@@ -178,8 +247,39 @@ class UserCoursePurchase(models.Model):
         return f"{self.user.username} - {self.course_pack.title}"
 
 
+class CourseProgress(models.Model):
+    """Progression compacte d'un utilisateur dans un pack de cours
+
+    completed_chapters est un bitmap: le bit n vaut 1 quand le chapitre
+    d'ordre n est terminé.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='course_progress')
+    course_pack = models.ForeignKey(CoursePack, on_delete=models.CASCADE)
+    completed_chapters = models.BinaryField(default=b'')
+    current_chapter_order = models.IntegerField(null=True, blank=True)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['user', 'course_pack']
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.course_pack.title}"
+    
+    def is_completed(self, order):
+        bitmap = bytes(self.completed_chapters)
+        return order >> 3 < len(bitmap) and bool(bitmap[order >> 3] >> (order & 7) & 1)
+    
+    def mark_completed(self, order):
+        bitmap = bytearray(self.completed_chapters)
+        if order >> 3 >= len(bitmap):
+            bitmap.extend(bytes((order >> 3) + 1 - len(bitmap)))
+        bitmap[order >> 3] |= 1 << (order & 7)
+        self.completed_chapters = bytes(bitmap)
+
+
 class ChapterProgress(models.Model):
-    """Progression de l'utilisateur dans un chapitre"""
+    """Progression de l'utilisateur dans un chapitre (remplacée par CourseProgress)"""
     STATUS_CHOICES = [
         ('IN_PROGRESS', 'En cours'),
         ('COMPLETED', 'Terminé'),
@@ -203,10 +303,41 @@ class QuizAttempt(models.Model):
     passed = models.BooleanField(default=False)
     can_retake = models.BooleanField(default=False)
     referral_option_used = models.BooleanField(default=False)
+    selected_choices = models.BinaryField(
+        default=b'', help_text="Identifiants des choix (uint32, 0 = sans réponse) dans l'ordre des questions"
+    )
+    client_submission_id = models.UUIDField(null=True, blank=True, help_text="Identifiant d'idempotence (synchro hors ligne)")
+    client_submitted_at = models.DateTimeField(null=True, blank=True)
     attempted_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-attempted_at']
+        unique_together = ['user', 'client_submission_id']
+
+
+class QuizQuestionStats(models.Model):
+    """Compteurs incrémentaux d'une question pour l'analyse des items"""
+    question = models.OneToOneField(QuizQuestion, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    attempts = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    score_sq_sum = models.FloatField(default=0)
+    correct_score_sum = models.FloatField(default=0)
+    
+    class Meta:
+        verbose_name_plural = "Quiz question stats"
+    
+    def __str__(self):
+        return str(self.question)
+
+
+class QuizChoiceStats(models.Model):
+    """Nombre de sélections d'un choix de réponse"""
+    choice = models.OneToOneField(QuizChoice, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    selections = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        verbose_name_plural = "Quiz choice stats"
 
 
 class PhysicalCenter(models.Model):
@@ -308,6 +439,20 @@ class ReferralReward(models.Model):
         return f"{self.name} ({self.points_required} points)"
 
 
+class ReferralPath(models.Model):
+    """Table de fermeture de l'arbre de parrainage: un lien par ancêtre et descendant"""
+    ancestor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='downline_paths')
+    descendant = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upline_paths')
+    depth = models.PositiveSmallIntegerField(help_text="1 pour un filleul direct, 2 pour le filleul d'un filleul...")
+    
+    class Meta:
+        unique_together = ['ancestor', 'descendant']
+        indexes = [models.Index(fields=['ancestor', 'depth'])]
+    
+    def __str__(self):
+        return f"{self.ancestor.username} -> {self.descendant.username} ({self.depth})"
+
+
 class ReferralRedemption(models.Model):
     """Historique d'échange de points"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='redemptions')
@@ -329,6 +474,43 @@ class ChatMessage(models.Model):
     
     class Meta:
         ordering = ['created_at']
+        indexes = [models.Index(fields=['sender', 'recipient', 'created_at', 'id'])]
     
     def __str__(self):
         return f"{self.sender.username} -> {self.recipient.username}"
+
+
+class Conversation(models.Model):
+    """Boîte de réception: une ligne par paire d'utilisateurs, tenue à jour à chaque message
+
+    user_low est toujours l'identifiant le plus petit de la paire.
+    """
+    PREVIEW_LENGTH = 120
+    
+    user_low = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    user_high = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    last_message_preview = models.CharField(max_length=PREVIEW_LENGTH, blank=True)
+    last_message_at = models.DateTimeField()
+    last_sender = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    unread_low = models.PositiveIntegerField(default=0, help_text="Messages non lus par user_low")
+    unread_high = models.PositiveIntegerField(default=0, help_text="Messages non lus par user_high")
+    
+    class Meta:
+        unique_together = ['user_low', 'user_high']
+        indexes = [
+            models.Index(fields=['user_low', '-last_message_at']),
+            models.Index(fields=['user_high', '-last_message_at']),
+        ]
+    
+    @staticmethod
+    def pair(user_id, other_user_id):
+        return min(user_id, other_user_id), max(user_id, other_user_id)
+    
+    def other_user(self, user_id):
+        return self.user_high if self.user_low_id == user_id else self.user_low
+    
+    def unread_for(self, user_id):
+        return self.unread_low if self.user_low_id == user_id else self.unread_high
+    
+    def __str__(self):
+        return f"{self.user_low_id} <-> {self.user_high_id}"
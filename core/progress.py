@@ -0,0 +1,80 @@
+from django.db import transaction
+
+from .models import Chapter, CourseProgress
+
+
+def enroll(user, course_pack):
+    """Progression d'un pack acheté, positionnée sur le premier chapitre
+
+    La ligne peut déjà exister (quiz réussi avant l'achat, pack remboursé
+    puis racheté): elle est alors conservée, seul le chapitre courant est
+    initialisé s'il manque. Un double achat est détecté par la contrainte
+    de UserCoursePurchase, pas ici.
+    """
+    first_order = course_pack.chapters.order_by('order').values_list('order', flat=True).first()
+    progress, created = CourseProgress.objects.get_or_create(
+        user=user,
+        course_pack=course_pack,
+        defaults={'current_chapter_order': first_order}
+    )
+    if not created and progress.current_chapter_order is None and first_order is not None:
+        CourseProgress.objects.filter(pk=progress.pk, current_chapter_order__isnull=True).update(
+            current_chapter_order=first_order
+        )
+        progress.current_chapter_order = first_order
+    return progress
+
+
+def chapter_statuses(user, course_pack_id):
+    """Statut de chaque chapitre d'un pack, dans l'ordre, en deux requêtes
+
+    Un chapitre est COMPLETED si son bit est positionné, IN_PROGRESS s'il est
+    le premier, suit un chapitre terminé ou est le chapitre courant, LOCKED
+    sinon. La progression est stockée par pack: il n'y a pas de date d'accès
+    par chapitre.
+    """
+    chapters = Chapter.objects.filter(course_pack_id=course_pack_id).order_by('order').values_list('id', 'order')
+    progress = CourseProgress.objects.filter(user=user, course_pack_id=course_pack_id).first()
+
+    statuses = []
+    previous_completed = True
+    for chapter_id, order in chapters:
+        if progress is not None and progress.is_completed(order):
+            status = 'COMPLETED'
+        elif previous_completed or (progress is not None and order == progress.current_chapter_order):
+            status = 'IN_PROGRESS'
+        else:
+            status = 'LOCKED'
+        previous_completed = status == 'COMPLETED'
+
+        statuses.append({'chapter': chapter_id, 'order': order, 'status': status})
+    return statuses
+
+
+def complete_chapter(user, chapter, pack_chapters=None):
+    """Marquer un chapitre terminé et débloquer le suivant; retourne le chapitre suivant
+
+    pack_chapters: chapitres du pack déjà chargés et triés par ordre, pour
+    éviter la recherche du chapitre suivant en base.
+    """
+    if pack_chapters is not None:
+        next_chapter = next((other for other in pack_chapters if other.order > chapter.order), None)
+    else:
+        next_chapter = Chapter.objects.filter(
+            course_pack_id=chapter.course_pack_id,
+            order__gt=chapter.order
+        ).order_by('order').first()
+
+    with transaction.atomic():
+        progress, created = CourseProgress.objects.select_for_update().get_or_create(
+            user=user,
+            course_pack_id=chapter.course_pack_id
+        )
+        progress.mark_completed(chapter.order)
+        if next_chapter is not None and (
+            progress.current_chapter_order is None or next_chapter.order > progress.current_chapter_order
+        ):
+            progress.current_chapter_order = next_chapter.order
+        progress.save(update_fields=['completed_chapters', 'current_chapter_order', 'updated_at'])
+
+    return next_chapter
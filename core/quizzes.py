@@ -0,0 +1,288 @@
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from rest_framework.renderers import JSONRenderer
+
+from .cache import TTLCache, get_version, bump_version
+from .models import Quiz, QuizQuestion, QuizChoice, QuizAttempt, QuizQuestionStats, QuizChoiceStats
+from .progress import complete_chapter
+from .serializers import QuizSerializer
+
+
+ANSWER_KEY_CACHE_PREFIX = 'elite:answer-key:v2:'
+QUIZ_PAYLOAD_CACHE_PREFIX = 'elite:quiz-payload:'
+# Écart type des scores en dessous duquel la variance est considérée nulle
+# (l'annulation numérique de E[X²] - E[X]² laisse un résidu de l'ordre de 1e-15)
+SCORE_STD_EPSILON = 1e-9
+
+
+def quiz_version_name(quiz_id):
+    return f'quiz:{quiz_id}'
+
+
+class AnswerKey:
+    """Corrigé compilé d'un quiz: questions ordonnées, points, choix valides et corrects"""
+
+    def __init__(self, quiz_id, version, question_ids, points, choices, correct):
+        self.quiz_id = quiz_id
+        self.version = version
+        self.question_ids = question_ids
+        self.points = points
+        self.choices = choices
+        self.correct = correct
+        self.total_points = sum(points.values())
+
+    @classmethod
+    def build(cls, quiz_id, version):
+        choices = defaultdict(set)
+        correct = defaultdict(set)
+        rows = QuizChoice.objects.filter(question__quiz_id=quiz_id).values_list('question_id', 'id', 'is_correct')
+        for question_id, choice_id, is_correct in rows:
+            choices[question_id].add(choice_id)
+            if is_correct:
+                correct[question_id].add(choice_id)
+
+        questions = list(QuizQuestion.objects.filter(quiz_id=quiz_id).values_list('id', 'points'))
+        return cls(
+            quiz_id,
+            version,
+            [question_id for question_id, _ in questions],
+            dict(questions),
+            {question_id: frozenset(choices[question_id]) for question_id, _ in questions},
+            {question_id: frozenset(correct[question_id]) for question_id, _ in questions},
+        )
+
+    def selections(self, answers):
+        """Choix sélectionné pour chaque question, dans l'ordre (None si absent ou invalide)"""
+        selected = []
+        for question_id in self.question_ids:
+            try:
+                choice_id = int(answers.get(str(question_id)) or 0)
+            except (ValueError, TypeError):
+                choice_id = 0
+            selected.append(choice_id if choice_id in self.choices[question_id] else None)
+        return selected
+
+    def grade(self, answers):
+        """Points obtenus pour des réponses {str(question_id): choice_id}"""
+        return sum(
+            self.points[question_id]
+            for question_id, choice_id in zip(self.question_ids, self.selections(answers))
+            if choice_id in self.correct[question_id]
+        )
+
+    def score(self, answers):
+        """Score sur 20"""
+        if self.total_points <= 0:
+            return 0
+        return self.grade(answers) / self.total_points * 20
+
+
+_answer_keys = TTLCache(settings.QUIZ_CACHE_MAX_ENTRIES, None)
+_payloads = TTLCache(settings.QUIZ_CACHE_MAX_ENTRIES, None)
+
+
+def _get_compiled(local_cache, prefix, quiz_id, build):
+    """(version, valeur) dérivée du quiz: mémoire du processus, puis cache Django, puis base"""
+    version = get_version(quiz_version_name(quiz_id))
+    compiled = local_cache.get(quiz_id)
+    if compiled is not None and compiled[0] == version:
+        return compiled
+
+    cache_key = f'{prefix}{quiz_id}:{version}'
+    value = cache.get(cache_key)
+    if value is None:
+        value = build(quiz_id, version)
+        cache.set(cache_key, value, timeout=None)
+
+    compiled = (version, value)
+    local_cache.set(quiz_id, compiled)
+    return compiled
+
+
+def get_answer_key(quiz_id):
+    """Corrigé compilé du quiz"""
+    return _get_compiled(_answer_keys, ANSWER_KEY_CACHE_PREFIX, quiz_id, AnswerKey.build)[1]
+
+
+def render_quiz(quiz_id, version=None):
+    """JSON du quiz côté étudiant, sans les bonnes réponses"""
+    quiz = Quiz.objects.prefetch_related('questions__choices').get(pk=quiz_id)
+    return JSONRenderer().render(QuizSerializer(quiz).data)
+
+
+def get_quiz_payload(quiz_id):
+    """(version, JSON) du quiz, sérialisé une seule fois par version"""
+    return _get_compiled(_payloads, QUIZ_PAYLOAD_CACHE_PREFIX, quiz_id, render_quiz)
+
+
+def invalidate_quiz(quiz_id):
+    bump_version(quiz_version_name(quiz_id))
+
+
+def pack_choices(selected):
+    """Choix sélectionnés en tableau uint32 little-endian, 0 pour sans réponse"""
+    return np.array([choice_id or 0 for choice_id in selected], dtype='<u4').tobytes()
+
+
+def unpack_choices(packed):
+    return [int(choice_id) or None for choice_id in np.frombuffer(bytes(packed), dtype='<u4')]
+
+
+def record_attempt(user, quiz_id, answer_key, answers, **fields):
+    """Enregistrer une tentative et mettre à jour les compteurs des items
+
+    Les compteurs sont incrémentés en SQL (F()) dans la même transaction que
+    la tentative, avec un nombre de requêtes indépendant du nombre de questions.
+    """
+    selected = answer_key.selections(answers)
+    score = fields['score']
+    correct_ids = [
+        question_id for question_id, choice_id in zip(answer_key.question_ids, selected)
+        if choice_id in answer_key.correct[question_id]
+    ]
+    choice_ids = [choice_id for choice_id in selected if choice_id is not None]
+
+    with transaction.atomic():
+        attempt = QuizAttempt.objects.create(
+            user=user, quiz_id=quiz_id, selected_choices=pack_choices(selected), **fields
+        )
+
+        QuizQuestionStats.objects.bulk_create(
+            [QuizQuestionStats(question_id=question_id) for question_id in answer_key.question_ids],
+            ignore_conflicts=True
+        )
+        QuizQuestionStats.objects.filter(question_id__in=answer_key.question_ids).update(
+            attempts=F('attempts') + 1,
+            score_sum=F('score_sum') + score,
+            score_sq_sum=F('score_sq_sum') + score * score,
+        )
+        if correct_ids:
+            QuizQuestionStats.objects.filter(question_id__in=correct_ids).update(
+                correct=F('correct') + 1,
+                correct_score_sum=F('correct_score_sum') + score,
+            )
+        if choice_ids:
+            QuizChoiceStats.objects.bulk_create(
+                [QuizChoiceStats(choice_id=choice_id) for choice_id in choice_ids],
+                ignore_conflicts=True
+            )
+            QuizChoiceStats.objects.filter(choice_id__in=choice_ids).update(selections=F('selections') + 1)
+
+    return attempt
+
+
+def grade_submission(user, chapter, answers, pack_chapters=None, **attempt_fields):
+    """Noter un quiz, enregistrer la tentative et débloquer le chapitre suivant si réussi
+
+    Retourne le résultat renvoyé au client.
+    """
+    answer_key = get_answer_key(chapter.quiz.id)
+    score = answer_key.score(answers)
+
+    # Logique conditionnelle
+    passed = score >= settings.QUIZ_PASS_THRESHOLD
+    can_use_referral = settings.QUIZ_REFERRAL_THRESHOLD <= score < settings.QUIZ_PASS_THRESHOLD
+
+    # Enregistrer la tentative, les réponses et les compteurs des items
+    record_attempt(
+        user,
+        chapter.quiz.id,
+        answer_key,
+        answers,
+        score=score,
+        passed=passed,
+        can_retake=not passed,
+        **attempt_fields
+    )
+
+    result = {
+        'score': score,
+        'passed': passed,
+        'can_use_referral_option': can_use_referral
+    }
+
+    if passed:
+        # Marquer le chapitre terminé et débloquer le suivant
+        next_chapter = complete_chapter(user, chapter, pack_chapters)
+
+        if next_chapter:
+            result['next_chapter_id'] = next_chapter.id
+        else:
+            result['message'] = 'Formation terminée! Rendez-vous au centre physique.'
+
+    elif can_use_referral:
+        result['message'] = 'Parrainez 4 membres ou recommencez le chapitre'
+        result['referrals_needed'] = settings.REFERRAL_REQUIRED_COUNT
+        result['current_referrals'] = user.referral_count
+
+    else:
+        result['message'] = 'Vous devez recommencer le chapitre'
+
+    return result
+
+
+def item_indices(attempts, correct, score_sum, score_sq_sum, correct_score_sum):
+    """Indices de difficulté (taux de réussite) et de discrimination (point-bisérial)
+
+    Accepte des scalaires ou des tableaux NumPy (un élément par question).
+    Les valeurs indéfinies (aucune tentative, variance nulle, question
+    réussie par tous ou par personne) sont NaN, jamais infinies.
+    """
+    n = np.asarray(attempts, dtype=float)
+    c = np.asarray(correct, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        difficulty = c / n
+        mean = np.asarray(score_sum, dtype=float) / n
+        std = np.sqrt(np.maximum(np.asarray(score_sq_sum, dtype=float) / n - mean ** 2, 0))
+        mean_correct = np.asarray(correct_score_sum, dtype=float) / c
+        mean_wrong = (np.asarray(score_sum, dtype=float) - np.asarray(correct_score_sum, dtype=float)) / (n - c)
+        discrimination = np.where(
+            (std <= SCORE_STD_EPSILON * np.maximum(np.abs(mean), 1)) | (c <= 0) | (c >= n),
+            np.nan,
+            (mean_correct - mean_wrong) / std * np.sqrt(difficulty * (1 - difficulty))
+        )
+    return difficulty, discrimination
+
+
+def quiz_analytics(quiz_id):
+    """Analyse des items d'un quiz, calculée uniquement à partir des compteurs"""
+    questions = list(QuizQuestion.objects.filter(quiz_id=quiz_id).values('id', 'order', 'text', 'points'))
+    stats = {
+        row['question_id']: row
+        for row in QuizQuestionStats.objects.filter(question__quiz_id=quiz_id).values()
+    }
+    selections = dict(
+        QuizChoiceStats.objects.filter(choice__question__quiz_id=quiz_id).values_list('choice_id', 'selections')
+    )
+    choices = defaultdict(list)
+    for choice in QuizChoice.objects.filter(question__quiz_id=quiz_id).order_by('id').values(
+        'id', 'question_id', 'text', 'is_correct'
+    ):
+        choices[choice.pop('question_id')].append({**choice, 'selections': selections.get(choice['id'], 0)})
+
+    columns = ['attempts', 'correct', 'score_sum', 'score_sq_sum', 'correct_score_sum']
+    matrix = np.array(
+        [[stats.get(question['id'], {}).get(column, 0) for column in columns] for question in questions],
+        dtype=float
+    ).reshape(len(questions), len(columns))
+    difficulty, discrimination = item_indices(*matrix.T)
+
+    def clean(value):
+        return round(float(value), 4) if np.isfinite(value) else None
+
+    return [
+        {
+            **question,
+            'attempts': int(matrix[row, 0]),
+            'correct': int(matrix[row, 1]),
+            'difficulty': clean(difficulty[row]),
+            'discrimination': clean(discrimination[row]),
+            'choices': choices[question['id']],
+        }
+        for row, question in enumerate(questions)
+    ]
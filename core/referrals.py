@@ -0,0 +1,220 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .authentication import invalidate_user
+from .leaderboard import add_points, update_score
+from .models import ReferralPath, ReferralRedemption, User, UserCoursePurchase
+from .progress import enroll
+
+
+def record_referral(referrer_id, user_id):
+    """Créditer un parrainage au parrain: compteur et point incrémentés en base
+
+    Un seul UPDATE ... SET col = col + 1, sans lecture préalable: aucune
+    inscription simultanée avec le même code ne peut écraser l'autre.
+    À appeler dans la transaction de l'inscription.
+    """
+    User.objects.filter(pk=referrer_id).update(
+        referral_count=F('referral_count') + 1,
+        referral_points=F('referral_points') + 1,
+    )
+    if settings.REFERRAL_CLOSURE_TABLE:
+        add_to_closure(referrer_id, [user_id])
+    add_points(referrer_id, 1)
+    # update() n'émet pas post_save: oublier l'utilisateur en cache après commit
+    transaction.on_commit(lambda: invalidate_user(referrer_id))
+
+
+def record_referrals(referrals):
+    """Version groupée de record_referral: {parrain: [nouveaux filleuls]}
+
+    Un UPDATE par parrain distinct, quel que soit le nombre de filleuls.
+    """
+    for referrer_id, user_ids in referrals.items():
+        User.objects.filter(pk=referrer_id).update(
+            referral_count=F('referral_count') + len(user_ids),
+            referral_points=F('referral_points') + len(user_ids),
+        )
+        if settings.REFERRAL_CLOSURE_TABLE:
+            add_to_closure(referrer_id, user_ids)
+        add_points(referrer_id, len(user_ids))
+    transaction.on_commit(lambda: [invalidate_user(referrer_id) for referrer_id in referrals])
+
+
+def forget_referral(referrer_id):
+    """Retirer un filleul supprimé du compteur du parrain (les points restent acquis)"""
+    User.objects.filter(pk=referrer_id, referral_count__gt=0).update(referral_count=F('referral_count') - 1)
+    transaction.on_commit(lambda: invalidate_user(referrer_id))
+
+
+def redeem_reward(user, reward):
+    """Échanger des points contre une récompense; retourne les points restants
+
+    Retourne None si les points sont insuffisants. Le débit est un UPDATE
+    conditionnel (referral_points >= coût): deux échanges simultanés ne
+    peuvent pas dépenser les mêmes points. Un pack déjà possédé lève
+    IntegrityError (contrainte unique) et annule le débit avec la transaction.
+    """
+    with transaction.atomic():
+        spent = User.objects.filter(pk=user.pk, referral_points__gte=reward.points_required).update(
+            referral_points=F('referral_points') - reward.points_required
+        )
+        if not spent:
+            return None
+        
+        # Attribuer la récompense
+        if reward.reward_type == 'COURSE_PACK' and reward.course_pack:
+            UserCoursePurchase.objects.create(
+                user=user,
+                course_pack=reward.course_pack,
+                payment_method='REFERRAL_POINTS',
+                amount_paid=0
+            )
+            enroll(user, reward.course_pack)
+        
+        ReferralRedemption.objects.create(user=user, reward=reward, points_spent=reward.points_required)
+        remaining = User.objects.filter(pk=user.pk).values_list('referral_points', flat=True).get()
+        update_score(user.pk, remaining)
+        transaction.on_commit(lambda: invalidate_user(user.pk))
+    
+    return remaining
+
+
+def referral_counts_subquery():
+    """Nombre réel de filleuls de chaque utilisateur, calculé par la base"""
+    counts = (
+        User.objects.filter(referred_by=OuterRef('pk'))
+        .order_by()
+        .values('referred_by')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts), Value(0))
+
+
+def repair_referral_counts(dry_run=False):
+    """Réaligner referral_count sur la table des filleuls; retourne les ids corrigés"""
+    drifted = list(
+        User.objects.annotate(actual=referral_counts_subquery())
+        .exclude(referral_count=F('actual'))
+        .values_list('pk', flat=True)
+    )
+    if drifted and not dry_run:
+        with transaction.atomic():
+            User.objects.filter(pk__in=drifted).update(referral_count=referral_counts_subquery())
+        for user_id in drifted:
+            invalidate_user(user_id)
+    return drifted
+
+
+def _tree_sql(sql):
+    """Compléter une requête sur l'arbre avec les noms réels des tables et colonnes"""
+    return sql.format(
+        user=connection.ops.quote_name(User._meta.db_table),
+        referred_by=connection.ops.quote_name(User._meta.get_field('referred_by').column),
+        path=connection.ops.quote_name(ReferralPath._meta.db_table),
+    )
+
+
+# Descendants d'un utilisateur avec leur profondeur et le filleul direct dont ils descendent
+DOWNLINE_CTE = """
+WITH RECURSIVE downline (id, root_id, depth) AS (
+    SELECT id, id, 1 FROM {user} WHERE {referred_by} = %s
+    UNION ALL
+    SELECT child.id, downline.root_id, downline.depth + 1
+    FROM {user} child JOIN downline ON child.{referred_by} = downline.id
+    WHERE downline.depth < %s
+)
+"""
+
+
+def _max_depth(max_depth):
+    limit = settings.REFERRAL_TREE_MAX_DEPTH
+    return limit if max_depth is None else max(1, min(max_depth, limit))
+
+
+def downline_levels(user_id, max_depth=None):
+    """Nombre de filleuls par niveau (1 = directs), en une requête
+
+    Lit la table de fermeture si REFERRAL_CLOSURE_TABLE est activé, sinon
+    parcourt referred_by avec une CTE récursive (SQLite et PostgreSQL). La
+    profondeur est bornée, ce qui protège aussi d'un cycle saisi dans l'admin.
+    """
+    max_depth = _max_depth(max_depth)
+    if settings.REFERRAL_CLOSURE_TABLE:
+        rows = (
+            ReferralPath.objects.filter(ancestor_id=user_id, depth__lte=max_depth)
+            .values_list('depth')
+            .annotate(count=Count('pk'))
+            .order_by('depth')
+        )
+    else:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                _tree_sql(DOWNLINE_CTE + "SELECT depth, COUNT(*) FROM downline GROUP BY depth ORDER BY depth"),
+                [user_id, max_depth]
+            )
+            rows = cursor.fetchall()
+    return [{'level': depth, 'count': count} for depth, count in rows]
+
+
+def top_subtrees(user_id, limit=5, max_depth=None):
+    """Filleuls directs dont la descendance (eux compris) est la plus grande"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            _tree_sql(
+                DOWNLINE_CTE
+                + "SELECT root.id, root.username, COUNT(*) AS size "
+                "FROM downline JOIN {user} root ON root.id = downline.root_id "
+                "GROUP BY root.id, root.username ORDER BY size DESC, root.id LIMIT %s"
+            ),
+            [user_id, _max_depth(max_depth), limit]
+        )
+        rows = cursor.fetchall()
+    return [{'user_id': root_id, 'username': username, 'size': size} for root_id, username, size in rows]
+
+
+def add_to_closure(referrer_id, user_ids):
+    """Rattacher de nouveaux inscrits à leur parrain et à tous les ancêtres de celui-ci"""
+    ancestors = [(referrer_id, 0)] + list(
+        ReferralPath.objects.filter(
+            descendant_id=referrer_id, depth__lt=settings.REFERRAL_TREE_MAX_DEPTH
+        ).values_list('ancestor_id', 'depth')
+    )
+    ReferralPath.objects.bulk_create(
+        [ReferralPath(ancestor_id=ancestor_id, descendant_id=user_id, depth=depth + 1)
+         for user_id in user_ids
+         for ancestor_id, depth in ancestors],
+        batch_size=1000
+    )
+
+
+def rebuild_referral_closure():
+    """Reconstruire toute la table de fermeture depuis referred_by; retourne le nombre de liens
+
+    À lancer avant d'activer REFERRAL_CLOSURE_TABLE, puis après des
+    modifications de parrain dans l'admin ou des suppressions d'utilisateurs.
+    """
+    with transaction.atomic():
+        ReferralPath.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                _tree_sql("""
+                WITH RECURSIVE paths (ancestor_id, descendant_id, depth) AS (
+                    SELECT {referred_by}, id, 1 FROM {user} WHERE {referred_by} IS NOT NULL
+                    UNION ALL
+                    SELECT paths.ancestor_id, child.id, paths.depth + 1
+                    FROM {user} child JOIN paths ON child.{referred_by} = paths.descendant_id
+                    WHERE paths.depth < %s
+                )
+                INSERT INTO {path} (ancestor_id, descendant_id, depth)
+                SELECT ancestor_id, descendant_id, MIN(depth) FROM paths
+                WHERE ancestor_id <> descendant_id
+                GROUP BY ancestor_id, descendant_id
+                """),
+                [settings.REFERRAL_TREE_MAX_DEPTH]
+            )
+    # rowcount n'est pas fiable pour un INSERT précédé d'une CTE sous SQLite
+    return ReferralPath.objects.count()
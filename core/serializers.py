@@ -1,6 +1,11 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
 from .models import *
+from .referrals import record_referral
 
 User = get_user_model()
 
@@ -80,31 +85,62 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         referral_code = validated_data.pop('referral_code_used', None)
         
-        # Créer l'utilisateur
-        user = User.objects.create_user(**validated_data)
-        
-        # Gérer le parrainage si code fourni
+        # Parrain résolu avant la création; un code introuvable est ignoré
+        referrer_id = None
         if referral_code:
-            try:
-                referrer = User.objects.get(referral_code=referral_code.upper())
-                user.referred_by = referrer
-                referrer.referral_points += 1
-                referrer.save()
-                user.save()
-            except User.DoesNotExist:
-                # En cas d'erreur, on continue sans parrainage
-                pass
+            referrer_id = User.objects.filter(
+                referral_code=referral_code.upper()
+            ).values_list('id', flat=True).first()
+        
+        # Hachage éventuellement déjà calculé hors du thread de la requête (vue asynchrone)
+        password = validated_data.pop('password')
+        password_hash = validated_data.pop('password_hash', None) or make_password(password)
+        
+        with transaction.atomic():
+            # Créer l'utilisateur directement rattaché à son parrain
+            user = User(referred_by_id=referrer_id, **validated_data)
+            user.username = User.normalize_username(user.username)
+            user.password = password_hash
+            user.save()
+            
+            # Compteur et points du parrain incrémentés en base, sans lecture
+            if referrer_id is not None:
+                record_referral(referrer_id, user.id)
         
         return user
 
 
+class EliteTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Jetons JWT portant l'état du formulaire de correspondance"""
+    
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['has_completed_matching'] = user.has_completed_matching
+        token['selected_profile_id'] = user.selected_profile_id
+        return token
+    
+    @classmethod
+    def tokens_for(cls, user):
+        refresh = cls.get_token(user)
+        return {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'phone', 
                   'city', 'academic_level', 'referral_code', 'referral_points', 
-                  'has_completed_matching', 'selected_profile']
-        read_only_fields = ['referral_code', 'referral_points', 'has_completed_matching']
+                  'referral_count', 'has_completed_matching', 'selected_profile']
+        read_only_fields = ['referral_code', 'referral_points', 'referral_count', 'has_completed_matching']
+    
+    def update(self, instance, validated_data):
+        # N'écrire que les champs modifiés: l'instance (cache d'authentification)
+        # peut porter des compteurs de parrainage périmés
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
 
 
 class MatchingAnswerSerializer(serializers.ModelSerializer):
@@ -135,13 +171,33 @@ class AdaptivePathSerializer(serializers.ModelSerializer):
         fields = ['id', 'profile', 'academic_level', 'steps', 'duration_months']
 
 
+class SparseFieldsetMixin:
+    """Restreindre les champs renvoyés avec ?fields=id,title,..."""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        fields = request.query_params.get('fields') if request else None
+        if fields:
+            requested = {name.strip() for name in fields.split(',')}
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+
 class ChapterSerializer(serializers.ModelSerializer):
     class Meta:
         model = Chapter
         fields = ['id', 'title', 'order', 'content_text', 'video_url']
 
 
-class CoursePackSerializer(serializers.ModelSerializer):
+class ChapterSummarySerializer(serializers.ModelSerializer):
+    """Chapitre sans son contenu, pour les listes"""
+    class Meta:
+        model = Chapter
+        fields = ['id', 'title', 'order']
+
+
+class CoursePackSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     chapters = ChapterSerializer(many=True, read_only=True)
     is_purchased = serializers.SerializerMethodField()
     
@@ -151,12 +207,28 @@ class CoursePackSerializer(serializers.ModelSerializer):
                   'profile', 'chapters', 'is_purchased']
     
     def get_is_purchased(self, obj):
+        # Valeur pré-calculée par la vue (annotation Exists)
+        if hasattr(obj, 'is_purchased'):
+            return obj.is_purchased
+        
         user = self.context.get('request').user if self.context.get('request') else None
         if user and user.is_authenticated:
             return UserCoursePurchase.objects.filter(user=user, course_pack=obj).exists()
         return False
 
 
+class CoursePackSummarySerializer(CoursePackSerializer):
+    """Pack de cours allégé pour le catalogue: titres des chapitres, sans contenu"""
+    chapters = ChapterSummarySerializer(many=True, read_only=True)
+    chapter_count = serializers.SerializerMethodField()
+    
+    class Meta(CoursePackSerializer.Meta):
+        fields = CoursePackSerializer.Meta.fields + ['chapter_count']
+    
+    def get_chapter_count(self, obj):
+        return len(obj.chapters.all())
+
+
 class QuizChoiceSerializer(serializers.ModelSerializer):
     class Meta:
         model = QuizChoice
@@ -183,6 +255,16 @@ class QuizSubmissionSerializer(serializers.Serializer):
     answers = serializers.DictField(child=serializers.IntegerField())
 
 
+class QuizSyncItemSerializer(QuizSubmissionSerializer):
+    id = serializers.UUIDField()
+    chapter_id = serializers.IntegerField()
+    submitted_at = serializers.DateTimeField(required=False)
+
+
+class QuizSyncSerializer(serializers.Serializer):
+    submissions = QuizSyncItemSerializer(many=True, allow_empty=False, max_length=settings.QUIZ_SYNC_MAX_BATCH)
+
+
 class ChapterProgressSerializer(serializers.ModelSerializer):
     class Meta:
         model = ChapterProgress
@@ -223,6 +305,13 @@ class ReferralRewardSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'reward_type', 'points_required', 'course_pack', 'scholarship_amount']
 
 
+class ReferralListSerializer(serializers.ModelSerializer):
+    """Filleul dans la liste paginée: champs minimaux"""
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'first_name', 'last_name', 'date_joined']
+
+
 class ChatMessageSerializer(serializers.ModelSerializer):
     sender_name = serializers.CharField(source='sender.username', read_only=True)
     recipient_name = serializers.CharField(source='recipient.username', read_only=True)
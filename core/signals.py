@@ -0,0 +1,84 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .authentication import invalidate_user
+from .matching import invalidate_scorer, invalidate_questionnaire
+from .quizzes import invalidate_quiz
+from .chat import refresh_conversation
+from .leaderboard import get_leaderboard, update_score
+from .referrals import forget_referral
+from .models import (
+    User, ChatMessage, MatchingQuestion, MatchingAnswer, MatchingAnswerWeight, Profile, Quiz, QuizQuestion, QuizChoice
+)
+
+
+@receiver([post_save, post_delete], sender=MatchingQuestion)
+@receiver([post_save, post_delete], sender=MatchingAnswer)
+@receiver([post_save, post_delete], sender=MatchingAnswerWeight)
+@receiver([post_save, post_delete], sender=Profile)
+def invalidate_matching(sender, **kwargs):
+    """Reconstruire la matrice de scoring après une modification dans l'admin"""
+    invalidate_scorer()
+
+
+@receiver([post_save, post_delete], sender=MatchingQuestion)
+@receiver([post_save, post_delete], sender=MatchingAnswer)
+def invalidate_matching_questionnaire(sender, **kwargs):
+    """Régénérer le questionnaire pré-sérialisé après une modification"""
+    invalidate_questionnaire()
+
+
+@receiver([post_save, post_delete], sender=MatchingAnswerWeight)
+def refresh_answer_weights_json(sender, instance, **kwargs):
+    """Garder la copie JSON profile_weights alignée sur la table des poids"""
+    answer = MatchingAnswer(pk=instance.answer_id)
+    answer.refresh_profile_weights()
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Points, profil ou statut du formulaire modifiés: recharger l'utilisateur"""
+    invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def update_leaderboard(sender, instance, update_fields=None, **kwargs):
+    """Points modifiés par save() (admin): reporter le solde au classement"""
+    if update_fields is None or 'referral_points' in update_fields:
+        update_score(instance.pk, instance.referral_points)
+
+
+@receiver(post_delete, sender=User)
+def remove_from_leaderboard(sender, instance, **kwargs):
+    get_leaderboard().remove(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def decrement_referral_count(sender, instance, **kwargs):
+    """Un filleul supprimé ne compte plus pour son parrain"""
+    if instance.referred_by_id is not None:
+        forget_referral(instance.referred_by_id)
+
+
+@receiver([post_save, post_delete], sender=Quiz)
+def invalidate_quiz_on_change(sender, instance, **kwargs):
+    invalidate_quiz(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=QuizQuestion)
+def invalidate_quiz_on_question_change(sender, instance, **kwargs):
+    invalidate_quiz(instance.quiz_id)
+
+
+@receiver([post_save, post_delete], sender=QuizChoice)
+def invalidate_quiz_on_choice_change(sender, instance, **kwargs):
+    """Corrigé à recompiler quand une bonne réponse change"""
+    quiz_id = QuizQuestion.objects.filter(pk=instance.question_id).values_list('quiz_id', flat=True).first()
+    if quiz_id is not None:
+        invalidate_quiz(quiz_id)
+
+
+@receiver(post_delete, sender=ChatMessage)
+def refresh_conversation_on_delete(sender, instance, **kwargs):
+    """Aperçu et non-lus recalculés quand un message disparaît"""
+    refresh_conversation(instance.sender_id, instance.recipient_id)
@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from . import views
+from . import async_views, views
 
 router = DefaultRouter()
 router.register(r'matching/questions', views.MatchingQuestionViewSet, basename='matching-questions')
@@ -23,6 +23,8 @@ urlpatterns = [
     path('auth/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('auth/profile/', views.UserProfileView.as_view(), name='user-profile'),
+    path('auth/async/register/', async_views.register, name='register-async'),
+    path('auth/async/login/', async_views.login, name='token-obtain-async'),
     
     # Matching
     path('matching/submit/', views.submit_matching_form, name='submit-matching'),
@@ -34,10 +36,13 @@ urlpatterns = [
     
     # Courses
     path('courses/my-courses/', views.get_user_courses, name='my-courses'),
+    path('chapters/<int:chapter_id>/', views.get_chapter, name='chapter-detail'),
     path('chapters/<int:chapter_id>/progress/', views.get_chapter_progress, name='chapter-progress'),
     path('chapters/<int:chapter_id>/quiz/', views.get_quiz, name='get-quiz'),
     path('chapters/<int:chapter_id>/quiz/submit/', views.submit_quiz, name='submit-quiz'),
     path('chapters/<int:chapter_id>/referral-bypass/', views.use_referral_bypass, name='referral-bypass'),
+    path('quizzes/sync/', views.sync_quiz_submissions, name='sync-quiz-submissions'),
+    path('quizzes/<int:quiz_id>/analytics/', views.get_quiz_analytics, name='quiz-analytics'),
     
     # Physical Centers
     path('centers/', views.get_physical_centers, name='physical-centers'),
@@ -47,9 +52,14 @@ urlpatterns = [
     
     # Referrals
     path('referrals/stats/', views.get_referral_stats, name='referral-stats'),
+    path('referrals/', views.ReferralListView.as_view(), name='referral-list'),
+    path('referrals/downline/', views.get_referral_downline, name='referral-downline'),
+    path('leaderboard/', views.get_referral_leaderboard, name='leaderboard'),
+    path('leaderboard/me/', views.get_my_leaderboard_rank, name='leaderboard-me'),
 
     # Users
     path('users/search/', views.search_users, name='search-users'),
+    path('users/import/', views.import_users_csv, name='import-users'),
 
     # Router URLs
     path('', include(router.urls)),
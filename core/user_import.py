@@ -0,0 +1,208 @@
+import csv
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import connections, transaction
+
+from .models import User
+from .referrals import record_referrals
+
+
+IMPORT_COLUMNS = [
+    'username', 'email', 'password', 'first_name', 'last_name', 'phone', 'city', 'academic_level', 'referral_code'
+]
+ACADEMIC_LEVELS = {level for level, label in User.LEVEL_CHOICES}
+# Colonnes copiées telles quelles dans User: longueur maximale et validateurs du modèle
+# (referral_code est le code du parrain, le mot de passe est haché)
+MODEL_FIELDS = {
+    column: User._meta.get_field(column) for column in IMPORT_COLUMNS if column not in ('password', 'referral_code')
+}
+
+
+def clean_row(row):
+    """Mêmes règles de format que UserRegistrationSerializer, sans requête
+
+    Les règles du serializer sont complétées par celles des champs du modèle
+    (max_length, UnicodeUsernameValidator, EmailValidator): une valeur trop
+    longue est rejetée sur sa ligne au lieu de faire échouer tout le paquet.
+
+    Retourne (données nettoyées, erreurs par champ).
+    """
+    data = {column: (row.get(column) or '').strip() for column in IMPORT_COLUMNS}
+    data['password'] = row.get('password') or ''
+    data['email'] = data['email'].lower()
+    data['referral_code'] = data['referral_code'].upper()
+    errors = {}
+
+    if not data['username']:
+        errors['username'] = "Le nom d'utilisateur est requis"
+    elif len(data['username']) < 3:
+        errors['username'] = "Le nom d'utilisateur doit contenir au moins 3 caractères"
+
+    if not data['email']:
+        errors['email'] = "L'email est requis"
+    elif '@' not in data['email'] or '.' not in data['email']:
+        errors['email'] = "Format d'email invalide"
+
+    if not data['password']:
+        errors['password'] = "Le mot de passe est requis"
+    elif len(data['password']) < 8:
+        errors['password'] = "Le mot de passe doit contenir au moins 8 caractères"
+
+    if data['phone'] and len(''.join(c for c in data['phone'] if c.isdigit() or c in '+-() ')) < 8:
+        errors['phone'] = "Format de téléphone invalide"
+
+    if data['city'] and len(data['city']) < 2:
+        errors['city'] = "Le nom de la ville doit contenir au moins 2 caractères"
+
+    if data['academic_level'] and data['academic_level'] not in ACADEMIC_LEVELS:
+        errors['academic_level'] = "Niveau académique invalide"
+
+    for column, field in MODEL_FIELDS.items():
+        if data[column] and column not in errors:
+            try:
+                field.run_validators(data[column])
+            except ValidationError as error:
+                errors[column] = ' '.join(str(message) for message in error.messages)
+
+    return data, errors
+
+
+def generate_referral_codes(count):
+    """Codes de parrainage uniques (format de User.save), vérifiés en une requête par tour"""
+    codes = set()
+    while len(codes) < count:
+        candidates = {str(uuid.uuid4())[:12].upper() for _ in range(count - len(codes))} - codes
+        taken = set(User.objects.filter(referral_code__in=candidates).values_list('referral_code', flat=True))
+        codes |= candidates - taken
+    return list(codes)
+
+
+class UserImport:
+    """Import d'élèves par paquets: validation ensembliste, hachage parallèle, bulk_create
+
+    Les doublons sont détectés dans le fichier (ensembles en mémoire) et en
+    base (une requête IN par paquet et par colonne). Chaque paquet est écrit
+    dans sa propre transaction.
+    """
+
+    def __init__(self, chunk_size=1000, pool=None, dry_run=False):
+        self.chunk_size = chunk_size
+        self.pool = pool
+        self.dry_run = dry_run
+        self.created = 0
+        self.errors = []
+        self._usernames = set()
+        self._emails = set()
+
+    def run(self, lines):
+        """Importer un CSV (itérable de lignes texte avec en-tête); retourne self"""
+        reader = csv.DictReader(lines)
+        chunk = []
+        for row in reader:
+            chunk.append((reader.line_num, row))
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._import_chunk(chunk)
+        self.errors.sort(key=lambda error: error['line'])
+        return self
+
+    def _reject(self, line, data, errors):
+        self.errors.append({'line': line, 'username': data.get('username', ''), 'errors': errors})
+
+    def _import_chunk(self, chunk):
+        rows = []
+        for line, row in chunk:
+            data, errors = clean_row(row)
+            if errors:
+                self._reject(line, data, errors)
+            else:
+                rows.append((line, data))
+
+        # Unicité et parrains vérifiés en une requête par colonne pour tout le paquet
+        existing_usernames = set(
+            User.objects.filter(username__in=[data['username'] for line, data in rows]).values_list('username', flat=True)
+        )
+        existing_emails = {
+            email.lower()
+            for email in User.objects.filter(email__in=[data['email'] for line, data in rows]).values_list('email', flat=True)
+        }
+        referrers = dict(
+            User.objects.filter(
+                referral_code__in={data['referral_code'] for line, data in rows if data['referral_code']}
+            ).values_list('referral_code', 'id')
+        )
+
+        valid = []
+        for line, data in rows:
+            errors = {}
+            if data['username'] in existing_usernames or data['username'] in self._usernames:
+                errors['username'] = "Ce nom d'utilisateur est déjà pris"
+            if data['email'] in existing_emails or data['email'] in self._emails:
+                errors['email'] = "Un compte avec cet email existe déjà"
+            if data['referral_code'] and data['referral_code'] not in referrers:
+                errors['referral_code'] = "Code de parrainage invalide"
+            if errors:
+                self._reject(line, data, errors)
+                continue
+            self._usernames.add(data['username'])
+            self._emails.add(data['email'])
+            valid.append(data)
+
+        if self.dry_run:
+            # Simulation: compter les lignes qui seraient créées
+            self.created += len(valid)
+            return
+        if not valid:
+            return
+
+        # Hachage PBKDF2 réparti sur le pool de processus
+        passwords = [data['password'] for data in valid]
+        if self.pool is not None:
+            hashes = list(self.pool.map(make_password, passwords, chunksize=max(1, len(passwords) // 64)))
+        else:
+            hashes = [make_password(password) for password in passwords]
+
+        users = [
+            User(
+                username=data['username'],
+                email=data['email'],
+                password=password_hash,
+                first_name=data['first_name'],
+                last_name=data['last_name'],
+                phone=data['phone'],
+                city=data['city'],
+                academic_level=data['academic_level'],
+                referral_code=code,
+                referred_by_id=referrers.get(data['referral_code']),
+            )
+            for data, password_hash, code in zip(valid, hashes, generate_referral_codes(len(valid)))
+        ]
+
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=500)
+            referrals = {}
+            for user in users:
+                if user.referred_by_id is not None:
+                    referrals.setdefault(user.referred_by_id, []).append(user.id)
+            record_referrals(referrals)
+        self.created += len(users)
+
+
+def import_users(lines, chunk_size=1000, workers=None, dry_run=False):
+    """Importer des élèves depuis un CSV; retourne (nombre créé, erreurs par ligne)"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or dry_run:
+        result = UserImport(chunk_size, dry_run=dry_run).run(lines)
+        return result.created, result.errors
+
+    # Les processus fils ne doivent pas hériter des connexions ouvertes
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        result = UserImport(chunk_size, pool=pool).run(lines)
+    return result.created, result.errors
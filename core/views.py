@@ -1,20 +1,47 @@
 from rest_framework import viewsets, status, generics
+from rest_framework.pagination import CursorPagination
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import get_user_model
-from django.db.models import Sum, Count, Q
+from django.db import transaction, DatabaseError, IntegrityError
+from django.db.models import Sum, Count, Q, Exists, OuterRef, Prefetch
 from django.conf import settings
+from django.http import HttpResponse
 from django.utils import timezone
-from collections import defaultdict
+from datetime import timedelta
+import io
+import uuid
 import openai
 
 from .models import *
 from .serializers import *
+from .progress import chapter_statuses, complete_chapter, enroll
+from .quizzes import get_quiz_payload, grade_submission, quiz_analytics
+from .referrals import downline_levels, redeem_reward, top_subtrees
+from .leaderboard import top, user_standing
+from .user_import import import_users
+from .jobs import job_log_path, start_command
+from .chat import history_page, mark_read, record_message
+from .matching import get_questionnaire, score_user, store_recommendations, weights_version
 
 User = get_user_model()
 
+
+def versioned_json_response(request, version, content):
+    """Réponse JSON pré-sérialisée avec ETag = version (304 si le client l'a déjà)"""
+    etag = f'"{version}"'
+    
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
 # ENDPOINT DE TEST POUR DIAGNOSTIC
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -45,9 +72,14 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
 
 class MatchingQuestionViewSet(viewsets.ReadOnlyModelViewSet):
     """Questions du formulaire de correspondance"""
-    queryset = MatchingQuestion.objects.filter(is_active=True)
+    queryset = MatchingQuestion.objects.filter(is_active=True).prefetch_related('answers')
     serializer_class = MatchingQuestionSerializer
     permission_classes = [IsAuthenticated]
+    
+    def list(self, request, *args, **kwargs):
+        """Questionnaire complet pré-sérialisé, versionné par ETag"""
+        version, content = get_questionnaire()
+        return versioned_json_response(request, version, content)
 
 
 
@@ -62,7 +94,8 @@ def submit_matching_form(request):
     if not responses:
         return Response({'error': 'Aucune réponse fournie'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Enregistrer les réponses
+    # Valider toutes les paires (question, réponse) en une seule requête
+    selected = {}
     for response_data in responses:
         question_id = response_data.get('question_id')
         answer_id = response_data.get('answer_id')
@@ -70,52 +103,38 @@ def submit_matching_form(request):
         if not question_id or not answer_id:
             return Response({'error': 'Données de réponse incomplètes'}, status=status.HTTP_400_BAD_REQUEST)
         
-
         try:
-            # Vérifier que la réponse existe avant de l'utiliser
-            answer = MatchingAnswer.objects.get(id=answer_id, question_id=question_id)
-            
-            UserMatchingResponse.objects.update_or_create(
-                user=user,
-                question_id=question_id,
-                defaults={'selected_answer_id': answer_id}
-            )
-        except MatchingAnswer.DoesNotExist:
+            selected[int(question_id)] = int(answer_id)
+        except (ValueError, TypeError):
             return Response({'error': 'Réponse ou question invalide'}, status=status.HTTP_400_BAD_REQUEST)
-        except Exception as e:
-            return Response({'error': f'Erreur lors de l\'enregistrement: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Algorithme de matching
-    profile_scores = defaultdict(int)
-    user_responses = UserMatchingResponse.objects.filter(user=user).select_related('selected_answer')
-    
-    for response in user_responses:
-        weights = response.selected_answer.profile_weights
-        
-        # S'assurer que weights est un dictionnaire
-        if isinstance(weights, str):
-            try:
-                import json
-                weights = json.loads(weights)
-            except json.JSONDecodeError:
-                weights = {}
-        
-        if not isinstance(weights, dict):
-            weights = {}
-        
-        for profile_id, score in weights.items():
-            try:
-                profile_scores[int(profile_id)] += int(score)
-            except (ValueError, TypeError):
-                # Ignorer les scores invalides
-                continue
+    valid_pairs = set(
+        MatchingAnswer.objects.filter(id__in=selected.values()).values_list('question_id', 'id')
+    )
+    if any(pair not in valid_pairs for pair in selected.items()):
+        return Response({'error': 'Réponse ou question invalide'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Trier les profils par score
-    sorted_profiles = sorted(profile_scores.items(), key=lambda x: x[1], reverse=True)
+    # Enregistrer les réponses en un seul upsert sur (user, question)
+    try:
+        with transaction.atomic():
+            UserMatchingResponse.objects.bulk_create(
+                [
+                    UserMatchingResponse(user=user, question_id=question_id, selected_answer_id=answer_id)
+                    for question_id, answer_id in selected.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['user', 'question'],
+                update_fields=['selected_answer'],
+            )
+    except DatabaseError as e:
+        return Response({'error': f'Erreur lors de l\'enregistrement: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Obtenir les 3 meilleurs profils
-    recommended_profile_ids = [p[0] for p in sorted_profiles[:3]]
-    recommended_profiles = Profile.objects.filter(id__in=recommended_profile_ids)
+    # Algorithme de matching: une seule agrégation GROUP BY profil en base
+    scores = score_user(user)
+    store_recommendations(weights_version(), [(user.id, scores)])
+    recommended_profile_ids = [profile_id for profile_id, _ in scores]
+    profiles_by_id = Profile.objects.in_bulk(recommended_profile_ids)
+    recommended_profiles = [profiles_by_id[pid] for pid in recommended_profile_ids if pid in profiles_by_id]
     
     serializer = ProfileSerializer(recommended_profiles, many=True)
     
@@ -136,11 +155,13 @@ def select_profile(request):
         profile = Profile.objects.get(id=profile_id)
         user.selected_profile = profile
         user.has_completed_matching = True
-        user.save()
+        user.save(update_fields=['selected_profile', 'has_completed_matching'])
         
+        # Nouveaux jetons: les anciens portent encore has_completed_matching=False
         return Response({
             'message': 'Profil sélectionné avec succès',
-            'profile': ProfileSerializer(profile).data
+            'profile': ProfileSerializer(profile).data,
+            'tokens': EliteTokenObtainPairSerializer.tokens_for(user)
         })
     except Profile.DoesNotExist:
         return Response({'error': 'Profil non trouvé'}, status=status.HTTP_404_NOT_FOUND)
@@ -203,6 +224,21 @@ class CoursePackViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = CoursePackSerializer
     permission_classes = [IsAuthenticated]
     
+    def get_queryset(self):
+        # Chapitres préchargés et achat calculé en sous-requête: 2 requêtes par page
+        purchased = UserCoursePurchase.objects.filter(user=self.request.user, course_pack=OuterRef('pk'))
+        chapters = Chapter.objects.all()
+        if self.action == 'list':
+            chapters = chapters.only('id', 'course_pack', 'title', 'order')
+        queryset = super().get_queryset().annotate(is_purchased=Exists(purchased))
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.prefetch_related(Prefetch('chapters', queryset=chapters))
+        return queryset
+    
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return CoursePackSummarySerializer
+        return CoursePackSerializer
 
     @action(detail=True, methods=['post'])
     def purchase(self, request, pk=None):
@@ -211,103 +247,91 @@ class CoursePackViewSet(viewsets.ReadOnlyModelViewSet):
         user = request.user
         payment_method = request.data.get('payment_method')
         
-        # Vérifier si déjà acheté
-        if UserCoursePurchase.objects.filter(user=user, course_pack=course_pack).exists():
-            return Response({'error': 'Pack déjà acheté'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Créer l'achat
-        purchase = UserCoursePurchase.objects.create(
-            user=user,
-            course_pack=course_pack,
-            payment_method=payment_method,
-            amount_paid=course_pack.price
-        )
-        
-        # Créer toutes les progressions pour ce pack de cours
-        chapters = course_pack.chapters.all().order_by('order')
-        created_progress = 0
+        if not payment_method:
+            return Response({'error': 'Méthode de paiement requise'}, status=status.HTTP_400_BAD_REQUEST)
         
-        for index, chapter in enumerate(chapters):
-            # Premier chapitre = EN_COURS, les autres = LOCKED
-            status = 'IN_PROGRESS' if index == 0 else 'LOCKED'
-            
-            ChapterProgress.objects.get_or_create(
-                user=user,
-                chapter=chapter,
-                defaults={'status': status}
-            )
-            created_progress += 1
+        # La contrainte unique (user, course_pack) détecte un double achat
+        try:
+            with transaction.atomic():
+                purchase = UserCoursePurchase.objects.create(
+                    user=user,
+                    course_pack=course_pack,
+                    payment_method=payment_method,
+                    amount_paid=course_pack.price
+                )
+                
+                # Une seule ligne de progression pour tout le pack, sur le premier chapitre
+                enroll(user, course_pack)
+        except IntegrityError:
+            return Response({'error': 'Pack déjà acheté'}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({
             'message': 'Achat réussi', 
             'purchase_id': purchase.id,
-            'chapters_unlocked': created_progress
+            'chapters_unlocked': course_pack.chapters.count()
         })
 
 
+    @action(detail=True, methods=['get'])
+    def progress(self, request, pk=None):
+        """Statut de tous les chapitres du pack"""
+        course_pack = self.get_object()
+        
+        if not course_pack.is_purchased:
+            return Response({'error': 'Pack de cours non acheté'}, status=status.HTTP_403_FORBIDDEN)
+        
+        return Response(chapter_statuses(request.user, course_pack.id))
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_user_courses(request):
     """Récupérer les cours achetés par l'utilisateur"""
     user = request.user
-    purchases = UserCoursePurchase.objects.filter(user=user).select_related('course_pack')
+    purchases = UserCoursePurchase.objects.filter(user=user).select_related('course_pack').prefetch_related(
+        Prefetch('course_pack__chapters', queryset=Chapter.objects.only('id', 'course_pack', 'title', 'order'))
+    )
     courses = [purchase.course_pack for purchase in purchases]
-    serializer = CoursePackSerializer(courses, many=True, context={'request': request})
+    for course in courses:
+        course.is_purchased = True
+    serializer = CoursePackSummarySerializer(courses, many=True, context={'request': request})
     return Response(serializer.data)
 
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_chapter(request, chapter_id):
+    """Contenu complet d'un chapitre, chargé à la demande"""
+    try:
+        chapter = Chapter.objects.get(id=chapter_id)
+    except Chapter.DoesNotExist:
+        return Response({'error': 'Chapitre non trouvé'}, status=status.HTTP_404_NOT_FOUND)
+    
+    if not UserCoursePurchase.objects.filter(user=request.user, course_pack_id=chapter.course_pack_id).exists():
+        return Response({'error': 'Pack de cours non acheté'}, status=status.HTTP_403_FORBIDDEN)
+    
+    return Response(ChapterSerializer(chapter).data)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_chapter_progress(request, chapter_id):
-    """Récupérer la progression d'un chapitre avec création automatique si nécessaire"""
+    """Récupérer la progression d'un chapitre: {chapter, order, status}"""
     user = request.user
     
     try:
         chapter = Chapter.objects.get(id=chapter_id)
-        course_pack = chapter.course_pack
         
         # Vérifier si l'utilisateur a acheté ce pack
-        if not UserCoursePurchase.objects.filter(user=user, course_pack=course_pack).exists():
+        if not UserCoursePurchase.objects.filter(user=user, course_pack_id=chapter.course_pack_id).exists():
             return Response({'error': 'Pack de cours non acheté'}, status=status.HTTP_403_FORBIDDEN)
         
-        # Essayer de récupérer la progression existante
-        try:
-            progress = ChapterProgress.objects.get(user=user, chapter_id=chapter_id)
-        except ChapterProgress.DoesNotExist:
-            # Créer automatiquement la progression si elle n'existe pas
-            # Déterminer le statut basé sur l'ordre du chapitre
-            chapters_before = Chapter.objects.filter(
-                course_pack=course_pack,
-                order__lt=chapter.order
-            ).order_by('order')
-            
-            status = 'IN_PROGRESS'
-            
-            # Vérifier si tous les chapitres précédents sont terminés
-            if chapters_before.exists():
-                all_previous_completed = True
-                for prev_chapter in chapters_before:
-                    try:
-                        prev_progress = ChapterProgress.objects.get(user=user, chapter=prev_chapter)
-                        if prev_progress.status != 'COMPLETED':
-                            all_previous_completed = False
-                            break
-                    except ChapterProgress.DoesNotExist:
-                        all_previous_completed = False
-                        break
-                
-                if not all_previous_completed:
-                    status = 'LOCKED'
-            
-            progress = ChapterProgress.objects.create(
-                user=user,
-                chapter=chapter,
-                status=status
-            )
-        
-        serializer = ChapterProgressSerializer(progress)
-        return Response(serializer.data)
+        # Le statut dépend des chapitres précédents, calculés en bloc
+        return Response(next(
+            item for item in chapter_statuses(user, chapter.course_pack_id)
+            if item['chapter'] == chapter.id
+        ))
         
     except Chapter.DoesNotExist:
         return Response({'error': 'Chapitre non trouvé'}, status=status.HTTP_404_NOT_FOUND)
@@ -316,14 +340,13 @@ def get_chapter_progress(request, chapter_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_quiz(request, chapter_id):
-    """Récupérer le quiz d'un chapitre"""
-    try:
-        chapter = Chapter.objects.get(id=chapter_id)
-        quiz = chapter.quiz
-        serializer = QuizSerializer(quiz)
-        return Response(serializer.data)
-    except (Chapter.DoesNotExist, Quiz.DoesNotExist):
+    """Récupérer le quiz d'un chapitre, pré-sérialisé et versionné par ETag"""
+    quiz_id = Quiz.objects.filter(chapter_id=chapter_id).values_list('id', flat=True).first()
+    if quiz_id is None:
         return Response({'error': 'Quiz non trouvé'}, status=status.HTTP_404_NOT_FOUND)
+    
+    version, content = get_quiz_payload(quiz_id)
+    return versioned_json_response(request, version, content)
 
 
 @api_view(['POST'])
@@ -333,90 +356,103 @@ def submit_quiz(request, chapter_id):
     user = request.user
     
     try:
-        chapter = Chapter.objects.get(id=chapter_id)
-        quiz = chapter.quiz
+        chapter = Chapter.objects.select_related('quiz').get(id=chapter_id)
         answers = request.data.get('answers', {})
         
-        # Calculer le score
-        total_points = 0
-        earned_points = 0
-        
-        for question in quiz.questions.all():
-            total_points += question.points
-            selected_choice_id = answers.get(str(question.id))
-            
-            if selected_choice_id:
-                try:
-                    choice = QuizChoice.objects.get(id=selected_choice_id, question=question)
-                    if choice.is_correct:
-                        earned_points += question.points
-                except QuizChoice.DoesNotExist:
-                    pass
-        
-        # Score sur 20
-        score = (earned_points / total_points * 20) if total_points > 0 else 0
-        
-        # Logique conditionnelle
-        passed = score >= settings.QUIZ_PASS_THRESHOLD
-        can_use_referral = settings.QUIZ_REFERRAL_THRESHOLD <= score < settings.QUIZ_PASS_THRESHOLD
-        
-        # Enregistrer la tentative
-        attempt = QuizAttempt.objects.create(
-            user=user,
-            quiz=quiz,
-            score=score,
-            passed=passed,
-            can_retake=not passed
-        )
+        # Score calculé en mémoire à partir du corrigé compilé
+        return Response(grade_submission(user, chapter, answers))
         
+    except (Chapter.DoesNotExist, Quiz.DoesNotExist):
+        return Response({'error': 'Quiz non trouvé'}, status=status.HTTP_404_NOT_FOUND)
+
 
-        # Mettre à jour ou créer la progression
-        progress, created = ChapterProgress.objects.get_or_create(
-            user=user, 
-            chapter=chapter,
-            defaults={'status': 'IN_PROGRESS'}
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def sync_quiz_submissions(request):
+    """Synchronisation des quiz passés hors ligne: notation groupée en une transaction"""
+    user = request.user
+    serializer = QuizSyncSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    submissions = serializer.validated_data['submissions']
+    
+    # Recherches partagées: tentatives déjà synchronisées, chapitres et quiz, chapitres des packs
+    already_synced = {
+        attempt.client_submission_id: attempt
+        for attempt in QuizAttempt.objects.filter(
+            user=user, client_submission_id__in=[item['id'] for item in submissions]
         )
-        
-        response_data = {
-            'score': score,
-            'passed': passed,
-            'can_use_referral_option': can_use_referral
-        }
-        
-        if passed:
-            progress.status = 'COMPLETED'
-            progress.save()
-            
-            # Débloquer le chapitre suivant
-            next_chapter = Chapter.objects.filter(
-                course_pack=chapter.course_pack,
-                order__gt=chapter.order
-            ).first()
+    }
+    chapters = Chapter.objects.select_related('quiz').in_bulk({item['chapter_id'] for item in submissions})
+    pack_chapters = {}
+    for chapter in Chapter.objects.filter(
+        course_pack_id__in={chapter.course_pack_id for chapter in chapters.values()}
+    ).order_by('order'):
+        pack_chapters.setdefault(chapter.course_pack_id, []).append(chapter)
+    
+    # Débloquer dans l'ordre des chapitres, puis des dates de passage
+    def sort_key(item):
+        chapter = chapters.get(item['chapter_id'])
+        return (
+            chapter.course_pack_id if chapter else 0,
+            chapter.order if chapter else 0,
+            item.get('submitted_at') or timezone.now(),
+        )
+    
+    results = {}
+    with transaction.atomic():
+        for item in sorted(submissions, key=sort_key):
+            result = {'id': item['id'], 'chapter_id': item['chapter_id']}
+            chapter = chapters.get(item['chapter_id'])
             
-            if next_chapter:
-                ChapterProgress.objects.get_or_create(
-                    user=user,
-                    chapter=next_chapter,
-                    defaults={'status': 'IN_PROGRESS'}
-                )
-                response_data['next_chapter_id'] = next_chapter.id
+            if item['id'] in results:
+                continue
+            if item['id'] in already_synced:
+                attempt = already_synced[item['id']]
+                result.update({'status': 'duplicate', 'score': attempt.score, 'passed': attempt.passed})
+            elif chapter is None or not hasattr(chapter, 'quiz'):
+                result.update({'status': 'error', 'error': 'Quiz non trouvé'})
             else:
-                response_data['message'] = 'Formation terminée! Rendez-vous au centre physique.'
-        
-        elif can_use_referral:
-            response_data['message'] = 'Parrainez 4 membres ou recommencez le chapitre'
-            response_data['referrals_needed'] = settings.REFERRAL_REQUIRED_COUNT
-            response_data['current_referrals'] = user.referrals.count()
-        
-        else:
-            response_data['message'] = 'Vous devez recommencer le chapitre'
-        
-        return Response(response_data)
-        
-    except (Chapter.DoesNotExist, Quiz.DoesNotExist):
+                try:
+                    # Point de sauvegarde: une synchro concurrente du même identifiant
+                    # (nouvel essai du client) n'annule que cet élément
+                    with transaction.atomic():
+                        graded = grade_submission(
+                            user,
+                            chapter,
+                            item['answers'],
+                            pack_chapters=pack_chapters[chapter.course_pack_id],
+                            client_submission_id=item['id'],
+                            client_submitted_at=item.get('submitted_at'),
+                        )
+                    result['status'] = 'graded'
+                    result.update(graded)
+                except IntegrityError:
+                    attempt = QuizAttempt.objects.filter(user=user, client_submission_id=item['id']).first()
+                    if attempt is None:
+                        raise
+                    result.update({'status': 'duplicate', 'score': attempt.score, 'passed': attempt.passed})
+            results[item['id']] = result
+    
+    # Résultats dans l'ordre de la requête; un identifiant répété est un doublon
+    response = []
+    seen = set()
+    for item in submissions:
+        result = results[item['id']]
+        if item['id'] in seen:
+            result = {**result, 'chapter_id': item['chapter_id'], 'status': 'duplicate'}
+        seen.add(item['id'])
+        response.append(result)
+    return Response({'results': response})
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def get_quiz_analytics(request, quiz_id):
+    """Difficulté et discrimination de chaque question d'un quiz (staff)"""
+    if not Quiz.objects.filter(id=quiz_id).exists():
         return Response({'error': 'Quiz non trouvé'}, status=status.HTTP_404_NOT_FOUND)
-    except ChapterProgress.DoesNotExist:
-        return Response({'error': 'Chapitre non accessible'}, status=status.HTTP_403_FORBIDDEN)
+    
+    return Response({'quiz': quiz_id, 'questions': quiz_analytics(quiz_id)})
 
 
 @api_view(['POST'])
@@ -425,8 +461,8 @@ def use_referral_bypass(request, chapter_id):
     """Utiliser l'option parrainage pour passer au chapitre suivant"""
     user = request.user
     
-    # Vérifier nombre de parrainages
-    referral_count = user.referrals.count()
+    # Vérifier nombre de parrainages (compteur dénormalisé)
+    referral_count = user.referral_count
     if referral_count < settings.REFERRAL_REQUIRED_COUNT:
         return Response({
             'error': f'Vous devez parrainer {settings.REFERRAL_REQUIRED_COUNT} membres',
@@ -436,37 +472,18 @@ def use_referral_bypass(request, chapter_id):
 
     try:
         chapter = Chapter.objects.get(id=chapter_id)
-        progress, created = ChapterProgress.objects.get_or_create(
-            user=user, 
-            chapter=chapter,
-            defaults={'status': 'IN_PROGRESS'}
-        )
-        
-        # Marquer le chapitre comme terminé
-        progress.status = 'COMPLETED'
-        progress.save()
         
         # Marquer l'option parrainage comme utilisée
         last_attempt = QuizAttempt.objects.filter(user=user, quiz=chapter.quiz).latest('attempted_at')
         last_attempt.referral_option_used = True
         last_attempt.save()
         
-        # Débloquer le chapitre suivant
-        next_chapter = Chapter.objects.filter(
-            course_pack=chapter.course_pack,
-            order__gt=chapter.order
-        ).first()
-        
-        if next_chapter:
-            ChapterProgress.objects.get_or_create(
-                user=user,
-                chapter=next_chapter,
-                defaults={'status': 'IN_PROGRESS'}
-            )
+        # Marquer le chapitre comme terminé et débloquer le suivant
+        next_chapter = complete_chapter(user, chapter)
         
         return Response({'message': 'Chapitre validé par parrainage', 'next_chapter_id': next_chapter.id if next_chapter else None})
         
-    except (Chapter.DoesNotExist, ChapterProgress.DoesNotExist):
+    except Chapter.DoesNotExist:
         return Response({'error': 'Chapitre non trouvé'}, status=status.HTTP_404_NOT_FOUND)
 
 
@@ -548,51 +565,109 @@ class ReferralRewardViewSet(viewsets.ReadOnlyModelViewSet):
         reward = self.get_object()
         user = request.user
         
-        if user.referral_points < reward.points_required:
+        # Débit conditionnel et attribution dans une seule transaction
+        try:
+            remaining = redeem_reward(user, reward)
+        except IntegrityError:
+            return Response({'error': 'Pack déjà acquis'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if remaining is None:
             return Response({
                 'error': 'Points insuffisants',
                 'required': reward.points_required,
-                'current': user.referral_points
+                'current': User.objects.filter(pk=user.pk).values_list('referral_points', flat=True).get()
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Déduire les points
-        user.referral_points -= reward.points_required
-        user.save()
-        
-        # Enregistrer l'échange
-        redemption = ReferralRedemption.objects.create(
-            user=user,
-            reward=reward,
-            points_spent=reward.points_required
-        )
-        
-        # Attribuer la récompense
-        if reward.reward_type == 'COURSE_PACK' and reward.course_pack:
-            UserCoursePurchase.objects.create(
-                user=user,
-                course_pack=reward.course_pack,
-                payment_method='REFERRAL_POINTS',
-                amount_paid=0
-            )
-        
-        return Response({'message': 'Récompense obtenue avec succès', 'remaining_points': user.referral_points})
+        return Response({'message': 'Récompense obtenue avec succès', 'remaining_points': remaining})
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_referral_stats(request):
-    """Statistiques de parrainage de l'utilisateur"""
+    """Statistiques de parrainage de l'utilisateur: agrégats uniquement
+
+    La liste des filleuls est servie paginée par ReferralListView.
+    """
     user = request.user
-    referrals = user.referrals.all()
+    now = timezone.now()
+    
+    # Inscriptions par période en une requête, sur l'index (referred_by, date_joined)
+    periods = user.referrals.aggregate(
+        last_7_days=Count('id', filter=Q(date_joined__gte=now - timedelta(days=7))),
+        last_30_days=Count('id', filter=Q(date_joined__gte=now - timedelta(days=30))),
+        this_month=Count('id', filter=Q(date_joined__gte=now.replace(day=1, hour=0, minute=0, second=0, microsecond=0))),
+    )
     
     return Response({
         'referral_code': user.referral_code,
-        'total_referrals': referrals.count(),
+        'total_referrals': user.referral_count,
         'referral_points': user.referral_points,
-        'referrals': UserSerializer(referrals, many=True).data
+        'referrals_by_period': periods,
     })
 
 
+class ReferralCursorPagination(CursorPagination):
+    page_size = 50
+    ordering = ('-date_joined', '-id')
+
+
+class ReferralListView(generics.ListAPIView):
+    """Filleuls de l'utilisateur, du plus récent au plus ancien, paginés par curseur"""
+    serializer_class = ReferralListSerializer
+    pagination_class = ReferralCursorPagination
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        return self.request.user.referrals.only('id', 'username', 'first_name', 'last_name', 'date_joined')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_referral_downline(request):
+    """Descendance de parrainage: effectif par niveau et plus grandes branches"""
+    user = request.user
+    try:
+        max_depth = int(request.query_params['max_depth']) if 'max_depth' in request.query_params else None
+    except ValueError:
+        return Response({'error': 'max_depth doit être un entier'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    levels = downline_levels(user.id, max_depth)
+    return Response({
+        'total': sum(level['count'] for level in levels),
+        'levels': levels,
+        'top_subtrees': top_subtrees(user.id, max_depth=max_depth),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_referral_leaderboard(request):
+    """Meilleurs ambassadeurs par points de parrainage"""
+    try:
+        limit = min(int(request.query_params.get('limit', 10)), settings.LEADERBOARD_MAX_LIMIT)
+    except ValueError:
+        return Response({'error': 'limit doit être un entier'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({'results': top(max(limit, 1))})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_my_leaderboard_rank(request):
+    """Rang de l'utilisateur et ses voisins au classement"""
+    try:
+        radius = min(int(request.query_params.get('radius', 2)), settings.LEADERBOARD_MAX_LIMIT // 2)
+    except ValueError:
+        return Response({'error': 'radius doit être un entier'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response(user_standing(request.user.id, max(radius, 0)))
+
+
+class ConversationCursorPagination(CursorPagination):
+    page_size = 30
+    ordering = ('-last_message_at', '-id')
+
+
 class ChatMessageViewSet(viewsets.ModelViewSet):
     """Messagerie entre utilisateurs"""
     serializer_class = ChatMessageSerializer
@@ -605,54 +680,122 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
         ) | ChatMessage.objects.filter(recipient=user)
     
     def perform_create(self, serializer):
-        serializer.save(sender=self.request.user)
+        with transaction.atomic():
+            message = serializer.save(sender=self.request.user)
+            record_message(message)
     
     @action(detail=False, methods=['get'])
     def conversations(self, request):
-        """Liste des conversations de l'utilisateur"""
+        """Boîte de réception: conversations les plus récentes d'abord, paginées par curseur"""
         user = self.request.user
-
-        # Récupérer tous les utilisateurs avec qui il a échangé
-        sent_to = ChatMessage.objects.filter(sender=user).values_list('recipient', flat=True).distinct()
-        received_from = ChatMessage.objects.filter(recipient=user).values_list('sender', flat=True).distinct()
-
-        user_ids = set(list(sent_to) + list(received_from))
-        users = User.objects.filter(id__in=user_ids)
-
+        user_fields = ('id', 'username', 'first_name', 'last_name')
+        
+        # Une requête sur les index (participant, last_message_at)
+        conversations = Conversation.objects.filter(
+            Q(user_low=user) | Q(user_high=user)
+        ).select_related('user_low', 'user_high').only(
+            'last_message_preview', 'last_message_at', 'last_sender_id', 'unread_low', 'unread_high',
+            *(f'user_low__{field}' for field in user_fields),
+            *(f'user_high__{field}' for field in user_fields),
+        )
+        paginator = ConversationCursorPagination()
+        page = paginator.paginate_queryset(conversations, request, view=self)
+        
         # Retourner seulement les champs nécessaires pour le frontend
-        conversations_data = [
-            {
-                'id': user.id,
-                'username': user.username,
-                'first_name': user.first_name,
-                'last_name': user.last_name
-            }
-            for user in users
-        ]
-
-        return Response(conversations_data)
+        conversations_data = []
+        for conversation in page:
+            other = conversation.other_user(user.id)
+            conversations_data.append({
+                'id': other.id,
+                'username': other.username,
+                'first_name': other.first_name,
+                'last_name': other.last_name,
+                'last_message': conversation.last_message_preview,
+                'last_message_at': conversation.last_message_at,
+                'last_message_is_mine': conversation.last_sender_id == user.id,
+                'unread_count': conversation.unread_for(user.id),
+            })
+
+        return paginator.get_paginated_response(conversations_data)
     
     @action(detail=False, methods=['get'])
     def with_user(self, request):
-        """Messages avec un utilisateur spécifique"""
+        """Messages avec un utilisateur spécifique, par ordre chronologique
+
+        ?after_id=<id>: uniquement les messages suivants (polling);
+        ?before_id=<id>: la page précédente; sans curseur: les plus récents.
+        ?limit=<n>: taille de page (CHAT_HISTORY_PAGE_SIZE par défaut).
+        """
         user = self.request.user
-        other_user_id = request.query_params.get('user_id')
         
-        if not other_user_id:
+        if not request.query_params.get('user_id'):
             return Response({'error': 'user_id requis'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            other_user_id = int(request.query_params['user_id'])
+            after_id = int(request.query_params.get('after_id') or 0) or None
+            before_id = int(request.query_params.get('before_id') or 0) or None
+            limit = int(request.query_params.get('limit') or settings.CHAT_HISTORY_PAGE_SIZE)
+        except ValueError:
+            return Response(
+                {'error': 'user_id, after_id, before_id et limit doivent être des entiers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = max(1, min(limit, settings.CHAT_HISTORY_MAX_PAGE_SIZE))
         
-        messages = ChatMessage.objects.filter(
-            (Q(sender=user) & Q(recipient_id=other_user_id)) |
-            (Q(sender_id=other_user_id) & Q(recipient=user))
-        ).order_by('created_at')
+        messages = history_page(user, other_user_id, after_id=after_id, before_id=before_id, limit=limit)
         
-        # Marquer comme lu
-        messages.filter(recipient=user, is_read=False).update(is_read=True)
+        # Marquer comme lu seulement s'il y a des messages reçus non lus dans la page
+        unread = [message for message in messages if message.recipient_id == user.id and not message.is_read]
+        if unread:
+            mark_read(user, other_user_id)
+            for message in unread:
+                message.is_read = True
         
         serializer = self.get_serializer(messages, many=True)
         return Response(serializer.data)
 
 
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def import_users_csv(request):
+    """Import groupé d'élèves d'une école partenaire (CSV en multipart, champ 'file')
+
+    ?dry_run=1 valide le fichier et retourne les erreurs immédiatement (sans
+    hachage). Sinon le fichier est confié à `manage.py import_users` dans un
+    processus séparé: la réponse 202 indique le journal et le rapport des
+    lignes rejetées.
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'error': 'Fichier CSV requis'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if request.query_params.get('dry_run') == '1':
+        created, errors = import_users(
+            io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''),
+            dry_run=True,
+        )
+        return Response({'created': created, 'errors': errors})
+    
+    # Fichier privé (mots de passe en clair), supprimé par la commande après l'import
+    directory = settings.JOB_LOG_DIR / 'imports'
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f"{timezone.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+    csv_path = directory / f'{name}.csv'
+    report_path = directory / f'{name}-rejets.csv'
+    with open(csv_path, 'wb') as destination:
+        for chunk in upload.chunks():
+            destination.write(chunk)
+    
+    if not start_command('import_users', str(csv_path), '--report', str(report_path), '--remove-csv'):
+        csv_path.unlink()
+        return Response({'error': 'Un import est déjà en cours'}, status=status.HTTP_409_CONFLICT)
+    
+    return Response(
+        {'status': 'started', 'log': str(job_log_path('import_users')), 'report': str(report_path)},
+        status=status.HTTP_202_ACCEPTED
+    )
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def search_users(request):
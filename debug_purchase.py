@@ -13,6 +13,7 @@ django.setup()
 
 from django.contrib.auth import get_user_model
 from core.models import *
+from core.progress import chapter_statuses, enroll
 
 User = get_user_model()
 
@@ -36,9 +37,10 @@ def debug_purchase_logic():
     chapters = course_pack.chapters.all().order_by('order')
     print(f"📖 Nombre de chapitres: {chapters.count()}")
     
-    for chapter in chapters:
-        progress_exists = ChapterProgress.objects.filter(user=user, chapter=chapter).exists()
-        print(f"   📝 Chapitre {chapter.order}: {chapter.title} - Progression: {'✅' if progress_exists else '❌'}")
+    progress_exists = CourseProgress.objects.filter(user=user, course_pack=course_pack).exists()
+    print(f"📈 Progression du pack: {'✅' if progress_exists else '❌'}")
+    for item in chapter_statuses(user, course_pack.id):
+        print(f"   📝 Chapitre {item['order']} (ID: {item['chapter']}) - {item['status']}")
     
     # Simuler l'achat (créer une nouvelle instance)
     print(f"\n🔄 Test de la logique d'achat:")
@@ -62,7 +64,7 @@ def debug_purchase_logic():
     
     # Supprimer anciens achats pour ce test
     UserCoursePurchase.objects.filter(user=test_user, course_pack=course_pack).delete()
-    ChapterProgress.objects.filter(user=test_user, chapter__course_pack=course_pack).delete()
+    CourseProgress.objects.filter(user=test_user, course_pack=course_pack).delete()
     
     print(f"   🗑️  Anciens achats et progressions supprimés")
     
@@ -77,38 +79,23 @@ def debug_purchase_logic():
     
     print(f"   ✅ Achat créé avec ID: {purchase.id}")
     
-    # Simuler la création des progressions (logique de la méthode purchase)
-    print(f"   📝 Création des progressions...")
-    chapters = course_pack.chapters.all().order_by('order')
-    created_progress = 0
-    
-    for index, chapter in enumerate(chapters):
-        status = 'IN_PROGRESS' if index == 0 else 'LOCKED'
-        
-        progress, created = ChapterProgress.objects.get_or_create(
-            user=test_user,
-            chapter=chapter,
-            defaults={'status': status}
-        )
-        
-        if created:
-            created_progress += 1
-            print(f"      ✅ Chapitre {chapter.order}: {chapter.title} - Créé ({status})")
-        else:
-            print(f"      🔄 Chapitre {chapter.order}: {chapter.title} - Déjà existant")
+    # Simuler la création de la progression (logique de la méthode purchase)
+    print(f"   📝 Création de la progression du pack...")
+    progress = enroll(test_user, course_pack)
+    first_order = course_pack.chapters.order_by('order').values_list('order', flat=True).first()
     
     print(f"\n📊 RÉSULTAT:")
-    print(f"   📈 Progressions créées: {created_progress}")
-    print(f"   📖 Total chapitres: {chapters.count()}")
+    print(f"   📍 Chapitre courant: {progress.current_chapter_order}")
+    print(f"   📖 Total chapitres: {course_pack.chapters.count()}")
     
-    if created_progress == chapters.count():
-        print(f"   ✅ SUCCÈS: Toutes les progressions ont été créées")
+    if progress.current_chapter_order == first_order:
+        print(f"   ✅ SUCCÈS: Progression positionnée sur le premier chapitre")
     else:
-        print(f"   ❌ ÉCHEC: Progressions manquantes")
+        print(f"   ❌ ÉCHEC: Chapitre courant inattendu")
     
     # Vérification finale
-    final_count = ChapterProgress.objects.filter(user=test_user, chapter__course_pack=course_pack).count()
-    print(f"   📊 Comptage final: {final_count} progressions")
+    for item in chapter_statuses(test_user, course_pack.id):
+        print(f"      Chapitre {item['order']}: {item['status']}")
 
 if __name__ == "__main__":
     debug_purchase_logic()
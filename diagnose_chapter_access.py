@@ -13,6 +13,7 @@ django.setup()
 
 from django.contrib.auth import get_user_model
 from core.models import *
+from core.progress import chapter_statuses, enroll
 
 User = get_user_model()
 
@@ -49,51 +50,20 @@ def diagnose_chapter_access(user_id=None):
     
     for purchase in purchases:
         course_pack = purchase.course_pack
-        chapters = Chapter.objects.filter(course_pack=course_pack).order_by('order')
+        progress = CourseProgress.objects.filter(user=user, course_pack=course_pack).first()
+        statuses = chapter_statuses(user, course_pack.id)
         
         print(f"\n   📦 Pack: {course_pack.title}")
-        print(f"      📊 {chapters.count()} chapitres trouvés")
+        print(f"      📊 {len(statuses)} chapitres trouvés")
+        if progress:
+            print(f"      ✅ Progression: chapitre courant {progress.current_chapter_order}")
+            print(f"      📅 Dernière mise à jour: {progress.updated_at}")
+        else:
+            print(f"      ❌ Aucune ligne de progression pour ce pack")
+            print(f"      💡 fix_chapter_access() la crée sur le premier chapitre")
         
-        for chapter in chapters:
-            # Vérifier la progression
-            progress = ChapterProgress.objects.filter(user=user, chapter=chapter).first()
-            
-            if progress:
-                print(f"      📝 Chapitre {chapter.order}: {chapter.title} (ID: {chapter.id})")
-                print(f"         ✅ Progression: {progress.status}")
-                print(f"         📅 Dernière accès: {progress.last_accessed}")
-            else:
-                print(f"      📝 Chapitre {chapter.order}: {chapter.title} (ID: {chapter.id})")
-                print(f"         ❌ Aucune progression - ERREUR 403")
-                
-                # Proposer une solution
-                if chapter.order == 1:
-                    # Premier chapitre - créer la progression
-                    ChapterProgress.objects.create(
-                        user=user,
-                        chapter=chapter,
-                        status='IN_PROGRESS'
-                    )
-                    print(f"         🔧 CORRECTION: Progression créée pour le premier chapitre")
-                else:
-                    # Vérifier si le chapitre précédent est terminé
-                    prev_chapter = Chapter.objects.filter(
-                        course_pack=course_pack,
-                        order=chapter.order - 1
-                    ).first()
-                    
-                    if prev_chapter:
-                        prev_progress = ChapterProgress.objects.filter(
-                            user=user, 
-                            chapter=prev_chapter
-                        ).first()
-                        
-                        if prev_progress and prev_progress.status == 'COMPLETED':
-                            print(f"         🔧 Proposer: Créer progression pour chapitre {chapter.order}")
-                        else:
-                            print(f"         ⛔ Chapitre {chapter.order-1} doit être terminé avant")
-                    else:
-                        print(f"         ⚠️  Chapitre précédent introuvable")
+        for item in statuses:
+            print(f"      📝 Chapitre {item['order']} (ID: {item['chapter']}): {item['status']}")
 
 def fix_chapter_access(user_id=None):
     """Corrige l'accès aux chapitres en créant les progressions manquantes"""
@@ -115,69 +85,30 @@ def fix_chapter_access(user_id=None):
     
     corrections_made = 0
     
-    # Créer les progressions manquantes pour tous les achats
+    # Créer la ligne de progression manquante de chaque pack acheté
     purchases = UserCoursePurchase.objects.filter(user=user)
     
     for purchase in purchases:
         course_pack = purchase.course_pack
-        chapters = Chapter.objects.filter(course_pack=course_pack).order_by('order')
-        
         print(f"\n📦 Correction pour: {course_pack.title}")
         
-        for chapter in chapters:
-            # Vérifier si la progression existe
-            progress = ChapterProgress.objects.filter(user=user, chapter=chapter).first()
-            
-            if not progress:
-                # Déterminer le statut basé sur l'ordre du chapitre
-                if chapter.order == 1:
-                    status = 'IN_PROGRESS'
-                    action = "Premier chapitre - En cours"
-                else:
-                    # Vérifier le chapitre précédent
-                    prev_chapter = Chapter.objects.filter(
-                        course_pack=course_pack,
-                        order=chapter.order - 1
-                    ).first()
-                    
-                    if prev_chapter:
-                        prev_progress = ChapterProgress.objects.filter(
-                            user=user, 
-                            chapter=prev_chapter
-                        ).first()
-                        
-                        if prev_progress and prev_progress.status == 'COMPLETED':
-                            status = 'IN_PROGRESS'
-                            action = "Chapitre précédent terminé - En cours"
-                        else:
-                            status = 'LOCKED'
-                            action = "Chapitre précédent non terminé - Verrouillé"
-                    else:
-                        status = 'LOCKED'
-                        action = "Chapitre précédent introuvable - Verrouillé"
-                
-                # Créer la progression
-                ChapterProgress.objects.create(
-                    user=user,
-                    chapter=chapter,
-                    status=status
-                )
-                
-                corrections_made += 1
-                print(f"   ✅ Chapitre {chapter.order}: {chapter.title}")
-                print(f"      📍 Statut: {status} ({action})")
+        if CourseProgress.objects.filter(user=user, course_pack=course_pack).exists():
+            print(f"   🔄 Progression déjà présente")
+            continue
+        
+        progress = enroll(user, course_pack)
+        corrections_made += 1
+        print(f"   ✅ Progression créée sur le chapitre {progress.current_chapter_order}")
     
     print(f"\n🎉 {corrections_made} corrections effectuées")
     
     # Vérifier les corrections
     print("\n🔍 Vérification après correction:")
-    total_progress = ChapterProgress.objects.filter(user=user).count()
-    print(f"   📊 Total progressions pour {user.username}: {total_progress}")
+    total_progress = CourseProgress.objects.filter(user=user).count()
+    print(f"   📊 Packs avec progression pour {user.username}: {total_progress}")
 
 def test_endpoints(user_id=None):
     """Teste les endpoints de progression des chapitres"""
-    import requests
-    
     print("\n🧪 Test des endpoints de progression")
     print("="*50)
     
@@ -200,17 +131,14 @@ def test_endpoints(user_id=None):
         chapters = Chapter.objects.filter(course_pack=purchase.course_pack).order_by('order')
         
         print(f"\n📦 {purchase.course_pack.title}:")
+        statuses = {item['chapter']: item['status'] for item in chapter_statuses(user, purchase.course_pack_id)}
         for chapter in chapters:
-            progress = ChapterProgress.objects.filter(user=user, chapter=chapter).first()
-            status = progress.status if progress else "PAS DE PROGRESSION"
-            
             print(f"   📖 Chapitre {chapter.order}: {chapter.title}")
-            print(f"      🆔 ID: {chapter.id} | 📊 Statut: {status}")
+            print(f"      🆔 ID: {chapter.id} | 📊 Statut: {statuses[chapter.id]}")
             
-            # Simuler l'endpoint
+            # Pack acheté: l'endpoint répond 200, avec ou sans ligne de progression
             endpoint = f"/api/chapters/{chapter.id}/progress/"
-            expected_status = "200" if progress else "403"
-            print(f"      🌐 Endpoint: {endpoint} | 📡 Status attendu: {expected_status}")
+            print(f"      🌐 Endpoint: {endpoint} | 📡 Status attendu: 200")
 
 def main():
     print("🚀 Diagnostic et Correction - Accès aux Chapitres Elite 2.0")
@@ -228,8 +156,8 @@ def main():
     print("\n" + "="*60)
     print("📋 RÉSUMÉ:")
     print("✅ Diagnostic de l'accès aux chapitres effectué")
-    print("✅ Progression manquantes créées")
-    print("✅ Statuts de verrouillage appliqués")
+    print("✅ Progressions de pack manquantes créées")
+    print("✅ Statuts calculés depuis le bitmap des packs")
     print("✅ Endpoints de progression testés")
     print("\n💡 Les erreurs 403 devraient maintenant être résolues!")
 
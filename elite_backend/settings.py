@@ -64,6 +64,19 @@ DATABASES = {
     }
 }
 
+# Coût du hachage des mots de passe (itérations PBKDF2-SHA256) et nombre de
+# hachages simultanés des vues d'authentification asynchrones
+PASSWORD_HASH_ITERATIONS = config('PASSWORD_HASH_ITERATIONS', default=720000, cast=int)
+AUTH_HASH_WORKERS = config('AUTH_HASH_WORKERS', default=4, cast=int)
+
+PASSWORD_HASHERS = [
+    'core.hashers.TunablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -87,7 +100,7 @@ AUTH_USER_MODEL = 'core.User'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -102,8 +115,38 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=30),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
+    'TOKEN_OBTAIN_SERIALIZER': 'core.serializers.EliteTokenObtainPairSerializer',
 }
 
+# Cache Django: porte les jetons de version (core.cache) qui invalident les
+# copies locales (barèmes des quiz, questionnaire, scoring) dans tous les
+# processus. Sans CACHE_REDIS_URL, le cache est propre au processus: un seul
+# worker est alors supporté (vérifié par core.E001 quand DEBUG est désactivé).
+CACHE_REDIS_URL = config('CACHE_REDIS_URL', default='')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Commandes longues lancées depuis l'admin ou l'API (core.jobs): journaux et
+# durée maximale du verrou si la commande meurt sans le libérer
+JOB_LOG_DIR = Path(config('JOB_LOG_DIR', default=str(BASE_DIR / 'logs')))
+JOB_LOCK_TIMEOUT = 6 * 3600
+
+# Authentication cache (jetons vérifiés et utilisateurs)
+AUTH_CACHE_TTL = 60
+AUTH_CACHE_MAX_ENTRIES = 10000
+AUTH_CACHE_SHARED = config('AUTH_CACHE_SHARED', default=False, cast=bool)
+
 # CORS Configuration
 CORS_ALLOW_ALL_ORIGINS = True
 
@@ -124,3 +167,24 @@ OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
 QUIZ_PASS_THRESHOLD = 14
 QUIZ_REFERRAL_THRESHOLD = 10
 REFERRAL_REQUIRED_COUNT = 4
+
+# Nombre de corrigés de quiz gardés en mémoire par processus
+QUIZ_CACHE_MAX_ENTRIES = 1000
+
+# Nombre maximal de quiz hors ligne synchronisés par requête
+QUIZ_SYNC_MAX_BATCH = 100
+
+# Arbre de parrainage: profondeur maximale parcourue et table de fermeture
+# (activer REFERRAL_CLOSURE_TABLE après `manage.py rebuild_referral_closure`)
+REFERRAL_TREE_MAX_DEPTH = 10
+REFERRAL_CLOSURE_TABLE = config('REFERRAL_CLOSURE_TABLE', default=False, cast=bool)
+
+# Classement des ambassadeurs: ZSET Redis si une URL est fournie, sinon en mémoire
+# (un seul worker, vérifié par core.E002 quand DEBUG est désactivé)
+LEADERBOARD_REDIS_URL = config('LEADERBOARD_REDIS_URL', default='')
+LEADERBOARD_KEY = 'elite:leaderboard:referral-points'
+LEADERBOARD_MAX_LIMIT = 100
+
+# Historique des conversations: taille de page par défaut et maximale
+CHAT_HISTORY_PAGE_SIZE = 50
+CHAT_HISTORY_MAX_PAGE_SIZE = 200
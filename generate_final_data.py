@@ -21,7 +21,7 @@ from django.contrib.auth import get_user_model
 from core.models import (
     MatchingQuestion, MatchingAnswer, UserMatchingResponse, Profile, AdaptivePath,
     UserPathValidation, CoursePack, Chapter, Quiz, QuizQuestion, QuizChoice,
-    UserCoursePurchase, ChapterProgress, QuizAttempt, PhysicalCenter, FAQCategory,
+    UserCoursePurchase, CourseProgress, QuizAttempt, PhysicalCenter, FAQCategory,
     FAQ, JobOffer, Competition, ReferralReward, ReferralRedemption, ChatMessage
 )
 
@@ -99,18 +99,25 @@ def generate_quick_data():
     print("📊 Génération de la progression...")
     progress_count = 0
     for user in random.sample(users, int(len(users) * 0.6)):  # 60% ont de la progression
+        # Une ligne CourseProgress par pack: bitmap des chapitres terminés et chapitre courant
+        progress_by_pack = {}
         for chapter in random.sample(chapters, random.randint(2, 6)):
             status = random.choices(['IN_PROGRESS', 'COMPLETED', 'LOCKED'], weights=[30, 50, 20])[0]
-            ChapterProgress.objects.get_or_create(
-                user=user,
-                chapter=chapter,
-                defaults={
-                    'status': status,
-                    'last_accessed': fake.date_time_between(start_date='-7d', end_date='now')
-                }
-            )
-            progress_count += 1
-    print(f"✅ {progress_count} progressions de chapitres")
+            progress = progress_by_pack.get(chapter.course_pack_id)
+            if progress is None:
+                progress, created = CourseProgress.objects.get_or_create(
+                    user=user,
+                    course_pack_id=chapter.course_pack_id
+                )
+                progress_by_pack[chapter.course_pack_id] = progress
+            if status == 'COMPLETED':
+                progress.mark_completed(chapter.order)
+            elif status == 'IN_PROGRESS':
+                progress.current_chapter_order = chapter.order
+        for progress in progress_by_pack.values():
+            progress.save()
+        progress_count += len(progress_by_pack)
+    print(f"✅ {progress_count} progressions de packs")
     
     # 5. Générer des tentatives de quiz
     print("🎯 Génération des tentatives de quiz...")
@@ -241,7 +248,7 @@ def show_final_stats():
     print(f"📖 Chapitres: {Chapter.objects.count()}")
     print(f"🧩 Quiz: {Quiz.objects.count()}")
     print(f"🎯 Tentatives quiz: {QuizAttempt.objects.count()}")
-    print(f"📊 Progression chapitres: {ChapterProgress.objects.count()}")
+    print(f"📊 Progression des packs: {CourseProgress.objects.count()}")
     print(f"📈 Parcours adaptatifs: {AdaptivePath.objects.count()}")
     print(f"✅ Validations parcours: {UserPathValidation.objects.count()}")
     print(f"🛒 Achats de cours: {UserCoursePurchase.objects.count()}")
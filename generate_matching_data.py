@@ -262,11 +262,11 @@ def create_matching_questions():
         created_questions.append(question)
         
         for answer_data in question_data['answers']:
-            MatchingAnswer.objects.create(
+            answer = MatchingAnswer.objects.create(
                 question=question,
-                text=answer_data['text'],
-                profile_weights=answer_data['weights']
+                text=answer_data['text']
             )
+            answer.set_weights(answer_data['weights'])
     
     print(f"✅ {len(created_questions)} questions de correspondance créées avec succès!")
     print("\nQuestions créées:")
@@ -21,7 +21,7 @@ from django.contrib.auth import get_user_model
 from core.models import (
     MatchingQuestion, MatchingAnswer, UserMatchingResponse, Profile, AdaptivePath,
     UserPathValidation, CoursePack, Chapter, Quiz, QuizQuestion, QuizChoice,
-    UserCoursePurchase, ChapterProgress, QuizAttempt, PhysicalCenter, FAQCategory,
+    UserCoursePurchase, CourseProgress, QuizAttempt, PhysicalCenter, FAQCategory,
     FAQ, JobOffer, Competition, ReferralReward, ReferralRedemption, ChatMessage
 )
 
@@ -227,21 +227,31 @@ def generate_chapter_progress(users, chapters):
         num_chapters = random.randint(2, 8)
         selected_chapters = random.sample(list(chapters), min(num_chapters, len(chapters)))
         
+        # Une ligne CourseProgress par pack: bitmap des chapitres terminés et chapitre courant
+        progress_by_pack = {}
         for chapter in selected_chapters:
             status = random.choices(
                 ['IN_PROGRESS', 'COMPLETED', 'LOCKED'],
                 weights=[30, 50, 20]
             )[0]
             
-            ChapterProgress.objects.create(
-                user=user,
-                chapter=chapter,
-                status=status,
-                last_accessed=fake.date_time_between(start_date='-7d', end_date='now')
-            )
-            progress_count += 1
+            progress = progress_by_pack.get(chapter.course_pack_id)
+            if progress is None:
+                progress, created = CourseProgress.objects.get_or_create(
+                    user=user,
+                    course_pack_id=chapter.course_pack_id
+                )
+                progress_by_pack[chapter.course_pack_id] = progress
+            if status == 'COMPLETED':
+                progress.mark_completed(chapter.order)
+            elif status == 'IN_PROGRESS':
+                progress.current_chapter_order = chapter.order
+        
+        for progress in progress_by_pack.values():
+            progress.save()
+        progress_count += len(progress_by_pack)
             
-    print(f"✅ {progress_count} progressions de chapitres créées")
+    print(f"✅ {progress_count} progressions de packs créées")
     return progress_count
 
 def generate_quiz_attempts(users, quizzes):
@@ -479,7 +489,7 @@ def main():
     print(f"   - {ChatMessage.objects.count()} messages de chat")
     print(f"   - {UserMatchingResponse.objects.count()} réponses de matching")
     print(f"   - {UserCoursePurchase.objects.count()} achats de cours")
-    print(f"   - {ChapterProgress.objects.count()} progressions")
+    print(f"   - {CourseProgress.objects.count()} progressions de packs")
     print(f"   - {QuizAttempt.objects.count()} tentatives de quiz")
     print(f"   - {AdaptivePath.objects.count()} parcours adaptatifs")
     print(f"   - {ReferralRedemption.objects.count()} échanges de points")
@@ -21,7 +21,7 @@ from django.contrib.auth import get_user_model
 from core.models import (
     MatchingQuestion, MatchingAnswer, UserMatchingResponse, Profile, AdaptivePath,
     UserPathValidation, CoursePack, Chapter, Quiz, QuizQuestion, QuizChoice,
-    UserCoursePurchase, ChapterProgress, QuizAttempt, PhysicalCenter, FAQCategory,
+    UserCoursePurchase, CourseProgress, QuizAttempt, PhysicalCenter, FAQCategory,
     FAQ, JobOffer, Competition, ReferralReward, ReferralRedemption, ChatMessage
 )
 
@@ -182,7 +182,9 @@ def generate_matching_answers(profiles, questions):
     
     answers = []
     for data in answers_data:
+        weights = data.pop('profile_weights')
         answer = MatchingAnswer.objects.create(**data)
+        answer.set_weights(weights)
         answers.append(answer)
         
     print(f"✅ {len(answers)} réponses créées")
@@ -499,7 +501,7 @@ def main():
     ChatMessage.objects.all().delete()
     ReferralRedemption.objects.all().delete()
     QuizAttempt.objects.all().delete()
-    ChapterProgress.objects.all().delete()
+    CourseProgress.objects.all().delete()
     UserCoursePurchase.objects.all().delete()
     QuizChoice.objects.all().delete()
     QuizQuestion.objects.all().delete()
@@ -10,11 +10,17 @@ interface Conversation {
   username: string
   first_name: string
   last_name: string
+  last_message?: string
+  last_message_at?: string
+  last_message_is_mine?: boolean
+  unread_count?: number
 }
 
 const ChatListScreen = ({ navigation }: any) => {
   const [conversations, setConversations] = useState<Conversation[]>([])
   const [loading, setLoading] = useState(true)
+  const [nextPage, setNextPage] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
 
   useEffect(() => {
     fetchConversations()
@@ -24,8 +30,10 @@ const ChatListScreen = ({ navigation }: any) => {
   const fetchConversations = async () => {
     try {
 
+      // Boîte de réception paginée par curseur, conversations les plus récentes d'abord
       const response = await apiClient.get("/api/messages/conversations/")
-      setConversations(response.data)
+      setConversations(response.data.results)
+      setNextPage(response.data.next)
     } catch (error: any) {
       console.warn("Impossible de charger les conversations depuis l'API, utilisation de données de test")
       
@@ -50,6 +58,20 @@ const ChatListScreen = ({ navigation }: any) => {
     }
   }
 
+  const fetchMoreConversations = async () => {
+    if (!nextPage || loadingMore) return
+    setLoadingMore(true)
+    try {
+      const response = await apiClient.get(nextPage)
+      setConversations((previous) => [...previous, ...response.data.results])
+      setNextPage(response.data.next)
+    } catch (error: any) {
+      console.warn("Impossible de charger plus de conversations")
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const renderConversation = ({ item }: { item: Conversation }) => (
     <TouchableOpacity
       style={styles.conversationCard}
@@ -64,8 +86,20 @@ const ChatListScreen = ({ navigation }: any) => {
           {item.first_name} {item.last_name}
         </Text>
         <Text style={styles.conversationUsername}>@{item.username}</Text>
+        {item.last_message ? (
+          <Text style={[styles.lastMessage, !!item.unread_count && styles.lastMessageUnread]} numberOfLines={1}>
+            {item.last_message_is_mine ? "Vous : " : ""}
+            {item.last_message}
+          </Text>
+        ) : null}
       </View>
-      <Ionicons name="chevron-forward" size={20} color="#9ca3af" />
+      {item.unread_count ? (
+        <View style={styles.unreadBadge}>
+          <Text style={styles.unreadBadgeText}>{item.unread_count}</Text>
+        </View>
+      ) : (
+        <Ionicons name="chevron-forward" size={20} color="#9ca3af" />
+      )}
     </TouchableOpacity>
   )
 
@@ -84,6 +118,9 @@ const ChatListScreen = ({ navigation }: any) => {
         renderItem={renderConversation}
         keyExtractor={(item) => item.id.toString()}
         contentContainerStyle={styles.list}
+        onEndReached={fetchMoreConversations}
+        onEndReachedThreshold={0.5}
+        ListFooterComponent={loadingMore ? <ActivityIndicator color="#6366f1" /> : null}
         ListEmptyComponent={
           <View style={styles.emptyContainer}>
             <Ionicons name="chatbubbles-outline" size={64} color="#d1d5db" />
@@ -149,6 +186,29 @@ const styles = StyleSheet.create({
     fontSize: 14,
     color: "#6b7280",
   },
+  lastMessage: {
+    fontSize: 14,
+    color: "#6b7280",
+    marginTop: 4,
+  },
+  lastMessageUnread: {
+    color: "#111827",
+    fontWeight: "600",
+  },
+  unreadBadge: {
+    minWidth: 24,
+    height: 24,
+    borderRadius: 12,
+    paddingHorizontal: 6,
+    backgroundColor: "#6366f1",
+    justifyContent: "center",
+    alignItems: "center",
+  },
+  unreadBadgeText: {
+    color: "#fff",
+    fontSize: 12,
+    fontWeight: "700",
+  },
   emptyContainer: {
     alignItems: "center",
     marginTop: 64,
@@ -25,29 +25,77 @@ interface Message {
   created_at: string
 }
 
+// Taille de page de l'historique (CHAT_HISTORY_PAGE_SIZE côté API)
+const PAGE_SIZE = 50
+
 const ChatScreen = ({ route }: any) => {
   const { userId, userName } = route.params
   const { user } = useSelector((state: RootState) => state.auth)
   const [messages, setMessages] = useState<Message[]>([])
   const [newMessage, setNewMessage] = useState("")
+  const [hasOlder, setHasOlder] = useState(false)
+  const [loadingOlder, setLoadingOlder] = useState(false)
   const flatListRef = useRef<FlatList>(null)
+  // Dernier message reçu: curseur du polling
+  const lastIdRef = useRef<number | null>(null)
 
   useEffect(() => {
+    lastIdRef.current = null
+    setMessages([])
     fetchMessages()
-    const interval = setInterval(fetchMessages, 3000) // Poll every 3 seconds
+    const interval = setInterval(pollMessages, 3000) // Poll every 3 seconds
     return () => clearInterval(interval)
   }, [userId])
 
+  // Page la plus récente de la conversation
   const fetchMessages = async () => {
     try {
 
-      const response = await apiClient.get(`/api/messages/with_user/?user_id=${userId}`)
+      const response = await apiClient.get(`/api/messages/with_user/?user_id=${userId}&limit=${PAGE_SIZE}`)
       setMessages(response.data)
+      setHasOlder(response.data.length === PAGE_SIZE)
+      if (response.data.length) {
+        lastIdRef.current = response.data[response.data.length - 1].id
+      }
+    } catch (error) {
+      console.error("Error fetching messages:", error)
+    }
+  }
+
+  // Uniquement les messages arrivés depuis le dernier reçu
+  const pollMessages = async () => {
+    if (lastIdRef.current === null) return fetchMessages()
+    try {
+      const response = await apiClient.get(
+        `/api/messages/with_user/?user_id=${userId}&after_id=${lastIdRef.current}&limit=${PAGE_SIZE}`,
+      )
+      if (!response.data.length) return
+      lastIdRef.current = response.data[response.data.length - 1].id
+      setMessages((previous) => {
+        const known = new Set(previous.map((message) => message.id))
+        return [...previous, ...response.data.filter((message: Message) => !known.has(message.id))]
+      })
     } catch (error) {
       console.error("Error fetching messages:", error)
     }
   }
 
+  const fetchOlderMessages = async () => {
+    if (!messages.length || loadingOlder) return
+    setLoadingOlder(true)
+    try {
+      const response = await apiClient.get(
+        `/api/messages/with_user/?user_id=${userId}&before_id=${messages[0].id}&limit=${PAGE_SIZE}`,
+      )
+      setMessages((previous) => [...response.data, ...previous])
+      setHasOlder(response.data.length === PAGE_SIZE)
+    } catch (error) {
+      console.error("Error fetching messages:", error)
+    } finally {
+      setLoadingOlder(false)
+    }
+  }
+
   const sendMessage = async () => {
     if (!newMessage.trim()) return
 
@@ -58,7 +106,7 @@ const ChatScreen = ({ route }: any) => {
         message: newMessage.trim(),
       })
       setNewMessage("")
-      fetchMessages()
+      pollMessages()
     } catch (error) {
       console.error("Error sending message:", error)
     }
@@ -96,7 +144,16 @@ const ChatScreen = ({ route }: any) => {
         renderItem={renderMessage}
         keyExtractor={(item) => item.id.toString()}
         contentContainerStyle={styles.messagesList}
-        onContentSizeChange={() => flatListRef.current?.scrollToEnd()}
+        onContentSizeChange={() => !loadingOlder && flatListRef.current?.scrollToEnd()}
+        ListHeaderComponent={
+          hasOlder ? (
+            <TouchableOpacity style={styles.olderButton} onPress={fetchOlderMessages} disabled={loadingOlder}>
+              <Text style={styles.olderButtonText}>
+                {loadingOlder ? "Chargement..." : "Charger les messages précédents"}
+              </Text>
+            </TouchableOpacity>
+          ) : null
+        }
         ListEmptyComponent={
           <View style={styles.emptyContainer}>
             <Ionicons name="chatbubble-ellipses-outline" size={64} color="#d1d5db" />
@@ -134,6 +191,17 @@ const styles = StyleSheet.create({
   messagesList: {
     padding: 16,
   },
+  olderButton: {
+    alignSelf: "center",
+    paddingHorizontal: 16,
+    paddingVertical: 8,
+    marginBottom: 16,
+  },
+  olderButtonText: {
+    color: "#6366f1",
+    fontSize: 14,
+    fontWeight: "600",
+  },
   messageContainer: {
     marginBottom: 16,
   },
@@ -34,36 +34,15 @@ const ChapterScreen = ({ route, navigation }: any) => {
       setCoursePack(packResponse.data)
 
 
-      // Get chapter progress
-      const chapters = packResponse.data.chapters || []
-      const progressData = []
-
-
-      // Récupérer les progrès pour chaque chapitre
-      for (const chapter of chapters) {
-        try {
-          const progressResponse = await apiClient.get(`/api/chapters/${chapter.id}/progress/`)
-          progressData.push(progressResponse.data)
-        } catch (error: any) {
-          // Chapter not started yet ou erreur d'autorisation (403)
-          if (error.response?.status === 403) {
-            // Chapitre non accessible - comportement normal
-            progressData.push({
-              chapter: chapter.id,
-              status: "NOT_STARTED",
-              score: 0,
-              completed: false
-            })
-          } else {
-            // Autre erreur - logger seulement si nécessaire
-            console.warn(`Unexpected error fetching progress for chapter ${chapter.id}:`, error.response?.status || error.message)
-            progressData.push({
-              chapter: chapter.id,
-              status: "NOT_STARTED",
-              score: 0,
-              completed: false
-            })
-          }
+      // Statut de tous les chapitres du pack en un seul appel
+      let progressData = []
+      try {
+        const progressResponse = await apiClient.get(`/api/courses/${coursePackId}/progress/`)
+        progressData = progressResponse.data
+      } catch (error: any) {
+        // Pack non acheté (403): tous les chapitres restent verrouillés
+        if (error.response?.status !== 403) {
+          console.warn("Unexpected error fetching course progress:", error.response?.status || error.message)
         }
       }
 
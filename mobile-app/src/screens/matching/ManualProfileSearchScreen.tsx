@@ -3,6 +3,7 @@
 import { useEffect, useState } from "react"
 import { View, Text, StyleSheet, FlatList, TouchableOpacity, ActivityIndicator, Alert } from "react-native"
 import { Ionicons } from "@expo/vector-icons"
+import AsyncStorage from "@react-native-async-storage/async-storage"
 import apiClient from "../../config/api"
 import { useDispatch } from "react-redux"
 import { updateUser } from "../../store/slices/authSlice"
@@ -47,7 +48,12 @@ const ManualProfileSearchScreen = ({ navigation }: any) => {
     setIsSubmitting(true)
     try {
 
-      await apiClient.post("/api/matching/select-profile/", { profile_id: selectedProfile })
+      const response = await apiClient.post("/api/matching/select-profile/", { profile_id: selectedProfile })
+
+      // Les nouveaux jetons portent has_completed_matching=true
+      const { access, refresh } = response.data.tokens
+      await AsyncStorage.setItem("auth_token", access)
+      await AsyncStorage.setItem("refresh_token", refresh)
 
 
       const userResponse = await apiClient.get("/api/auth/profile/")
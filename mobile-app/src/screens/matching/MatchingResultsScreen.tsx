@@ -4,6 +4,7 @@
 import { useState } from "react"
 import { View, Text, StyleSheet, ScrollView, TouchableOpacity, Alert, ActivityIndicator } from "react-native"
 import { Ionicons } from "@expo/vector-icons"
+import AsyncStorage from "@react-native-async-storage/async-storage"
 import apiClient from "../../config/api"
 import { useDispatch, useSelector } from "react-redux"
 import { updateUser } from "../../store/slices/authSlice"
@@ -32,6 +33,11 @@ const MatchingResultsScreen = ({ route, navigation }: any) => {
         profile_id: selectedProfile,
       })
 
+      // Les nouveaux jetons portent has_completed_matching=true
+      const { access, refresh } = response.data.tokens
+      await AsyncStorage.setItem("auth_token", access)
+      await AsyncStorage.setItem("refresh_token", refresh)
+
 
       const userResponse = await apiClient.get("/api/auth/profile/")
       dispatch(updateUser(userResponse.data))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Script de test du budget de requêtes SQL du catalogue de cours
+"""
+
+import os
+import sys
+import django
+
+# Configuration Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'elite_backend.settings')
+django.setup()
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from core.models import *
+
+# Nombre maximal de requêtes, indépendant du nombre de packs et de chapitres
+QUERY_BUDGETS = {
+    '/api/courses/': 3,             # COUNT de pagination + packs annotés + chapitres
+    '/api/courses/my-courses/': 2,  # achats avec packs + chapitres
+}
+
+
+def create_catalog(packs=10, chapters=8):
+    """Crée un catalogue de test et un utilisateur ayant acheté la moitié des packs"""
+    profile, _ = Profile.objects.get_or_create(
+        name='Profil Budget Requêtes',
+        defaults={'description': 'Profil de test', 'category': 'Test'}
+    )
+    user, created = User.objects.get_or_create(
+        username='test_user_catalog',
+        defaults={'email': 'test_catalog@example.com', 'has_completed_matching': True}
+    )
+    
+    for i in range(packs):
+        course_pack, created = CoursePack.objects.get_or_create(
+            title=f'Pack Budget {i}',
+            defaults={'domain': 'Test', 'description': 'Pack de test', 'price': 10, 'profile': profile}
+        )
+        if created:
+            Chapter.objects.bulk_create([
+                Chapter(course_pack=course_pack, order=order, title=f'Chapitre {order}')
+                for order in range(1, chapters + 1)
+            ])
+        if i % 2 == 0:
+            UserCoursePurchase.objects.get_or_create(
+                user=user, course_pack=course_pack,
+                defaults={'payment_method': 'TEST', 'amount_paid': 0}
+            )
+    return user
+
+
+def test_query_budgets():
+    user = create_catalog()
+    client = APIClient()
+    client.force_authenticate(user)
+    
+    failures = 0
+    for url, budget in QUERY_BUDGETS.items():
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        
+        ok = response.status_code == 200 and len(queries) <= budget
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {url}: {len(queries)} requêtes (budget {budget}), status {response.status_code}")
+    
+    return failures
+
+
+if __name__ == '__main__':
+    sys.exit(1 if test_query_budgets() else 0)
@@ -13,9 +13,14 @@ from django.contrib.auth import get_user_model
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'elite_backend.settings')
 django.setup()
 
+from django.conf import settings
+from rest_framework.test import APIClient
+
 from core.models import *
+from core.progress import enroll
 
 User = get_user_model()
+settings.ALLOWED_HOSTS = ['*']
 
 def create_test_user_and_purchase():
     """Crée un utilisateur test et simule un achat"""
@@ -72,7 +77,7 @@ def create_test_user_and_purchase():
         chapters_count = course_pack.chapters.count()
         print(f"   🔄 Pack existant avec {chapters_count} chapitres")
     
-    # Simuler un achat
+    # Simuler un achat (même enregistrement que CoursePackViewSet.purchase)
     purchase, created = UserCoursePurchase.objects.get_or_create(
         user=user,
         course_pack=course_pack,
@@ -81,6 +86,7 @@ def create_test_user_and_purchase():
             'amount_paid': course_pack.price
         }
     )
+    enroll(user, course_pack)
     
     if created:
         print(f"   ✅ Achat simulé pour {course_pack.title}")
@@ -89,24 +95,28 @@ def create_test_user_and_purchase():
     
     return user, course_pack
 
+def get_progress(client, chapter):
+    response = client.get(f'/api/chapters/{chapter.id}/progress/')
+    return response.status_code, response.json()
+
 def test_chapter_progress_endpoints():
     """Teste les endpoints de progression des chapitres"""
     print("\n🧪 Test des endpoints de progression des chapitres")
     print("="*50)
     
     user, course_pack = create_test_user_and_purchase()
+    client = APIClient()
+    client.force_authenticate(user)
     
-    # Vérifier les progressions créées lors de l'achat
-    print(f"\n📊 Vérification des progressions après achat:")
-    progress_count = ChapterProgress.objects.filter(user=user, chapter__course_pack=course_pack).count()
-    expected_count = course_pack.chapters.count()
+    # Une seule ligne CourseProgress par pack, positionnée sur le premier chapitre
+    print(f"\n📊 Vérification de la progression après achat:")
+    progress = CourseProgress.objects.filter(user=user, course_pack=course_pack).first()
+    first_order = course_pack.chapters.order_by('order').values_list('order', flat=True).first()
     
-    print(f"   📈 Progressions trouvées: {progress_count}/{expected_count}")
-    
-    if progress_count == expected_count:
-        print("   ✅ Toutes les progressions ont été créées lors de l'achat")
+    if progress is not None and progress.current_chapter_order == first_order:
+        print(f"   ✅ Progression du pack créée lors de l'achat (chapitre courant: {first_order})")
     else:
-        print("   ⚠️  Progressions manquantes détectées")
+        print("   ⚠️  Progression du pack manquante ou mal positionnée")
     
     # Tester chaque endpoint de progression
     chapters = course_pack.chapters.all().order_by('order')
@@ -116,107 +126,56 @@ def test_chapter_progress_endpoints():
     total_count = chapters.count()
     
     for chapter in chapters:
-        progress = ChapterProgress.objects.filter(user=user, chapter=chapter).first()
-        status = progress.status if progress else "NON CRÉÉ"
+        status_code, data = get_progress(client, chapter)
         
         print(f"\n   📖 Chapitre {chapter.order}: {chapter.title}")
         print(f"      🆔 ID: {chapter.id}")
-        print(f"      📊 Statut progression: {status}")
+        print(f"      📊 Statut progression: {data.get('status', 'N/A')}")
         
-        # Simuler l'endpoint (en vérifiant la logique interne)
-        if progress:
-            expected_status = 200
+        if status_code == 200:
             result = "✅ RÉUSSI (200)"
             success_count += 1
         else:
-            expected_status = 403
-            result = "❌ ÉCHEC (403)"
+            result = f"❌ ÉCHEC ({status_code})"
         
-        print(f"      🌐 Endpoint attendu: /api/chapters/{chapter.id}/progress/ -> {result}")
+        print(f"      🌐 Endpoint: /api/chapters/{chapter.id}/progress/ -> {result}")
     
     print(f"\n📈 RÉSULTATS:")
     print(f"   ✅ Endpoints réussis: {success_count}/{total_count}")
     print(f"   📊 Taux de réussite: {(success_count/total_count)*100:.1f}%")
     
-    if success_count == total_count:
+    if progress is not None and success_count == total_count:
         print("   🎉 TOUS LES ENDPOINTS FONCTIONNENT CORRECTEMENT!")
         return True
     else:
         print("   ⚠️  Certains endpoints échouent encore")
         return False
 
-def test_auto_creation():
-    """Teste la création automatique des progressions"""
-    print("\n🔄 Test de création automatique des progressions")
+def test_missing_progress():
+    """Teste les statuts quand la ligne de progression du pack n'existe pas"""
+    print("\n🔄 Test sans ligne de progression")
     print("="*50)
     
     user, course_pack = create_test_user_and_purchase()
+    client = APIClient()
+    client.force_authenticate(user)
     
-    # Supprimer quelques progressions pour tester la recréation automatique
-    chapters = course_pack.chapters.all().order_by('order')
-    test_chapter = chapters[2]  # Chapitre du milieu
+    print(f"🗑️  Suppression de la progression du pack {course_pack.title}")
+    CourseProgress.objects.filter(user=user, course_pack=course_pack).delete()
     
-    print(f"🗑️  Suppression de la progression du chapitre {test_chapter.order}")
-    ChapterProgress.objects.filter(user=user, chapter=test_chapter).delete()
+    # Les statuts sont calculés sans ligne: premier chapitre en cours, les suivants verrouillés
+    chapters = list(course_pack.chapters.all().order_by('order'))
+    statuses = [get_progress(client, chapter) for chapter in chapters]
+    expected = ['IN_PROGRESS'] + ['LOCKED'] * (len(chapters) - 1)
+    found = [data.get('status') for status_code, data in statuses]
+    print(f"   📊 Statuts: {found}")
     
-    # Vérifier qu'elle n'existe plus
-    progress_exists_before = ChapterProgress.objects.filter(user=user, chapter=test_chapter).exists()
-    print(f"   📊 Progression existe avant test: {progress_exists_before}")
+    success = all(status_code == 200 for status_code, data in statuses) and found == expected
+    print(f"   🎯 Statuts sans progression: {'✅ RÉUSSI' if success else '❌ ÉCHEC'}")
     
-    # Simuler l'appel à get_chapter_progress (logique interne)
-    try:
-        chapter = Chapter.objects.get(id=test_chapter.id)
-        course_pack_check = chapter.course_pack
-        
-        # Vérifier l'achat
-        purchase_exists = UserCoursePurchase.objects.filter(user=user, course_pack=course_pack_check).exists()
-        print(f"   🛒 Achat vérifié: {purchase_exists}")
-        
-        if purchase_exists:
-            # Tenter de récupérer la progression (comme le fait l'endpoint)
-            try:
-                progress = ChapterProgress.objects.get(user=user, chapter=chapter)
-                print(f"   ✅ Progression existante trouvée")
-                auto_created = False
-            except ChapterProgress.DoesNotExist:
-                print(f"   🔧 Progression manquante - logique de création automatique activée")
-                
-                # Logique de l'endpoint (simplifiée)
-                chapters_before = Chapter.objects.filter(
-                    course_pack=course_pack_check,
-                    order__lt=chapter.order
-                ).order_by('order')
-                
-                status = 'IN_PROGRESS'
-                if chapters_before.exists():
-                    all_previous_completed = True
-                    for prev_chapter in chapters_before:
-                        try:
-                            prev_progress = ChapterProgress.objects.get(user=user, chapter=prev_chapter)
-                            if prev_progress.status != 'COMPLETED':
-                                all_previous_completed = False
-                                break
-                        except ChapterProgress.DoesNotExist:
-                            all_previous_completed = False
-                            break
-                    
-                    if not all_previous_completed:
-                        status = 'LOCKED'
-                
-                progress = ChapterProgress.objects.create(
-                    user=user,
-                    chapter=chapter,
-                    status=status
-                )
-                print(f"   ✅ Progression créée automatiquement avec statut: {status}")
-                auto_created = True
-            
-            print(f"   🎯 Test de création automatique: {'✅ RÉUSSI' if auto_created else 'ℹ️  Pas nécessaire'}")
-            return True
-            
-    except Exception as e:
-        print(f"   ❌ Erreur lors du test: {e}")
-        return False
+    # Un nouvel achat (pack remboursé puis racheté) recrée la ligne
+    enroll(user, course_pack)
+    return success
 
 def main():
     print("🚀 Test des Corrections - Endpoints de Progression des Chapitres")
@@ -225,22 +184,22 @@ def main():
     # Test 1: Vérification des progressions après achat
     test1_success = test_chapter_progress_endpoints()
     
-    # Test 2: Test de création automatique
-    test2_success = test_auto_creation()
+    # Test 2: Statuts sans ligne de progression
+    test2_success = test_missing_progress()
     
     print("\n" + "="*60)
     print("📋 RÉSUMÉ FINAL:")
     print(f"✅ Test progressions après achat: {'RÉUSSI' if test1_success else 'ÉCHEC'}")
-    print(f"✅ Test création automatique: {'RÉUSSI' if test2_success else 'ÉCHEC'}")
+    print(f"✅ Test sans progression: {'RÉUSSI' if test2_success else 'ÉCHEC'}")
     
     if test1_success and test2_success:
         print("\n🎉 TOUTES LES CORRECTIONS FONCTIONNENT CORRECTEMENT!")
         print("💡 Les erreurs HTTP 403 sur /api/chapters/{id}/progress/ sont résolues")
         print("\n📋 MODIFICATIONS APPLIQUÉES:")
-        print("   1. CoursePackViewSet.purchase() - Création de toutes les progressions")
-        print("   2. get_chapter_progress() - Création automatique des progressions manquantes")
-        print("   3. submit_quiz() - Utilisation de get_or_create")
-        print("   4. use_referral_bypass() - Utilisation de get_or_create")
+        print("   1. CoursePackViewSet.purchase() - Une ligne CourseProgress par pack")
+        print("   2. get_chapter_progress() - Statuts calculés depuis le bitmap du pack")
+        print("   3. submit_quiz() - progress.complete_chapter()")
+        print("   4. use_referral_bypass() - progress.complete_chapter()")
     else:
         print("\n⚠️  CERTAINES CORRECTIONS NÉCESSITENT UNE ATTENTION SUPPLÉMENTAIRE")
 
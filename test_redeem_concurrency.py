@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Script de test de charge: échanges de récompenses simultanés
+
+Lance de nombreux appels parallèles à /api/rewards/<id>/redeem/ et vérifie
+qu'aucun point n'est dépensé deux fois et qu'un pack n'est attribué qu'une fois.
+Usage: python test_redeem_concurrency.py [nombre_de_requêtes]
+"""
+
+import os
+import sys
+import django
+from concurrent.futures import ThreadPoolExecutor
+
+# Configuration Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'elite_backend.settings')
+django.setup()
+
+from django.conf import settings
+from django.db import connection
+from rest_framework.test import APIClient
+from core.models import *
+
+settings.ALLOWED_HOSTS = ['*']
+
+REWARD_COST = 3
+INITIAL_POINTS = 50
+
+
+def setup_user_and_rewards():
+    """Utilisateur avec un solde connu, une bourse et un pack à échanger"""
+    user, created = User.objects.get_or_create(
+        username='test_user_redeem',
+        defaults={'email': 'test_redeem@example.com', 'has_completed_matching': True}
+    )
+    User.objects.filter(pk=user.pk).update(referral_points=INITIAL_POINTS)
+    ReferralRedemption.objects.filter(user=user).delete()
+    UserCoursePurchase.objects.filter(user=user, payment_method='REFERRAL_POINTS').delete()
+    CourseProgress.objects.filter(user=user).delete()
+
+    profile, _ = Profile.objects.get_or_create(
+        name='Profil Charge Récompenses',
+        defaults={'description': 'Profil de test', 'category': 'Test'}
+    )
+    course_pack, _ = CoursePack.objects.get_or_create(
+        title='Pack Charge Récompenses',
+        defaults={'domain': 'Test', 'description': 'Pack de test', 'price': 10, 'profile': profile}
+    )
+    scholarship, _ = ReferralReward.objects.get_or_create(
+        name='Bourse Charge',
+        defaults={'reward_type': 'SCHOLARSHIP', 'points_required': REWARD_COST, 'scholarship_amount': 100}
+    )
+    pack_reward, _ = ReferralReward.objects.get_or_create(
+        name='Pack Charge',
+        defaults={'reward_type': 'COURSE_PACK', 'points_required': REWARD_COST, 'course_pack': course_pack}
+    )
+    return user, scholarship, pack_reward
+
+
+def redeem(user, reward):
+    """Un appel d'échange depuis son propre thread (et sa propre connexion)"""
+    client = APIClient()
+    client.force_authenticate(user)
+    try:
+        return client.post(f'/api/rewards/{reward.id}/redeem/').status_code
+    except Exception as exc:
+        return type(exc).__name__
+    finally:
+        connection.close()
+
+
+def run_parallel(user, reward, requests):
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        return list(executor.map(lambda _: redeem(user, reward), range(requests)))
+
+
+def test_concurrent_redeems(requests):
+    user, scholarship, pack_reward = setup_user_and_rewards()
+    failures = 0
+
+    # 1. Plusieurs packs demandés en même temps: un seul attribué, un seul débit
+    results = run_parallel(user, pack_reward, requests)
+    purchases = UserCoursePurchase.objects.filter(user=user, course_pack=pack_reward.course_pack).count()
+    points = User.objects.get(pk=user.pk).referral_points
+    ok = results.count(200) == 1 and purchases == 1 and points == INITIAL_POINTS - REWARD_COST
+    failures += not ok
+    print(f"{'✅' if ok else '❌'} pack: {results.count(200)} succès, {purchases} achat, {points} points restants")
+
+    # 2. Plus de demandes que de points: jamais de solde négatif ni de double dépense
+    results = run_parallel(user, scholarship, requests)
+    user.refresh_from_db()
+    spent = sum(ReferralRedemption.objects.filter(user=user).values_list('points_spent', flat=True))
+    ok = (
+        user.referral_points >= 0
+        and spent == INITIAL_POINTS - user.referral_points
+        and results.count(200) + 1 == ReferralRedemption.objects.filter(user=user).count()
+    )
+    failures += not ok
+    outcomes = {outcome: results.count(outcome) for outcome in set(results)}
+    print(f"{'✅' if ok else '❌'} bourse: {outcomes}, {spent} points dépensés, {user.referral_points} restants")
+
+    return failures
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    sys.exit(1 if test_concurrent_redeems(count) else 0)